@@ -127,7 +127,8 @@ class CerraStoreRecipe(Recipe[CerraStoreAsset]):
                     folder=area_folder,
                     area=self.conf.area,
                     api_key=self.conf.api_key,
-                    processing_workers=2
+                    download_workers=2,
+                    convert_workers=2
                 )
             )
 
@@ -1,5 +1,5 @@
-from typing import Any, Callable, Literal, NotRequired, TypedDict, Unpack, cast
-from collections.abc import Collection
+from typing import Any, Callable, Literal, NotRequired, TypedDict, Unpack, cast, get_args
+from collections.abc import Collection, Iterator
 from dataclasses import dataclass
 
 from ..common.explode_dict import (
@@ -61,14 +61,23 @@ class AtomicRequest:
     built_data: dict[str, Any]
 
 
-def explode_request_data(request: ExplodableRequestData) -> list[AtomicRequestData]:
-    return cast(list[AtomicRequestData], explode(request))
+def explode_request_data(request: ExplodableRequestData) -> Iterator[AtomicRequestData]:
+    yield from cast(Iterator[AtomicRequestData], explode(request))
 
 
 class ValidationError(Exception):
     pass
 
 
+# String forms of the expected request values, precomputed once since requests are built for every atomic request.
+# Other values are formatted on the fly and sent as they are.
+_HEIGHT_LEVEL_STR = {height: f"{height}_m" for height in get_args(HeightLevel)}
+_MONTH_STR = {month: f"{month:02d}" for month in range(1, 13)}
+_DAY_STR = {day: f"{day:02d}" for day in range(1, 32)}
+_TIME_STR = {hour: f"{hour:02d}:00" for hour in get_args(Time)}
+_LEADTIME_STR = {hour: str(hour) for hour in get_args(Leadtime)}
+
+
 def build_request_data(**kwargs: Unpack[AtomicRequestData]) -> dict[str, Any]:
     def as_list(value):
         if isinstance(value, _Many):
@@ -79,22 +88,23 @@ def build_request_data(**kwargs: Unpack[AtomicRequestData]) -> dict[str, Any]:
 
     req = {
         "variable": [str(x) for x in as_list(kwargs["variable"])],
-        "height_level": [f"{height}_m" for height in as_list(kwargs["height_level_m"])],
+        "height_level": [_HEIGHT_LEVEL_STR.get(height) or f"{height}_m" for height in as_list(kwargs["height_level_m"])],
         "data_type": [str(x) for x in as_list(kwargs["data_type"])],
         "product_type": [str(x) for x in as_list(kwargs["product_type"])],
         "year": [str(year) for year in as_list(kwargs["year"])],
-        "month": [f"{month:02d}" for month in as_list(kwargs["month"])],
-        "day": [f"{day:02d}" for day in as_list(kwargs["day"])],
-        "time": [f"{hour:02d}:00" for hour in as_list(kwargs["time_h"])],
+        "month": [_MONTH_STR.get(month) or f"{month:02d}" for month in as_list(kwargs["month"])],
+        "day": [_DAY_STR.get(day) or f"{day:02d}" for day in as_list(kwargs["day"])],
+        "time": [_TIME_STR.get(hour) or f"{hour:02d}:00" for hour in as_list(kwargs["time_h"])],
         "data_format": kwargs["data_format"]
     }
     if "leadtime_hour" in kwargs:
-        req["leadtime_hour"] = [str(x) for x in as_list(kwargs["leadtime_hour"])]
+        req["leadtime_hour"] = [_LEADTIME_STR.get(x) or str(x) for x in as_list(kwargs["leadtime_hour"])]
 
     # Validate
-    if "forecast" in req["product_type"] and "leadtime_hour" not in req:
+    product_types = set(req["product_type"])
+    if "forecast" in product_types and "leadtime_hour" not in req:
         raise ValidationError("Forecast requires leadtime hour")
-    if "turbulent_kinetic_energy" in req["variable"] and "forecast" not in req["product_type"]:
+    if "turbulent_kinetic_energy" in req["variable"] and "forecast" not in product_types:
         raise ValidationError("TKE requires product type 'forecast'")
 
     return req
@@ -113,13 +123,11 @@ class CerraClient:
             name=request.name
         )
 
-    def prepare_request(self, request: ExplodableRequestData, *, on_validation_error: Literal["raise", "skip"] = "skip", get_name: Callable[[AtomicRequestData], str] | None = None):
+    def prepare_request(self, request: ExplodableRequestData, *, on_validation_error: Literal["raise", "skip"] = "skip", get_name: Callable[[AtomicRequestData], str] | None = None) -> Iterator[AtomicRequest]:
         """
-        Submit one or multiple cerra-heights requests to CDS API.
-        Yields results when they become available.
+        Split one or multiple cerra-heights requests into atomic requests.
+        Yields atomic requests lazily, one at a time.
         """
-        # Generate list of atomic requests
-        reqs: list[AtomicRequest] = []
         for r in explode_request_data(request):
             name = get_name(r) if get_name is not None else None
 
@@ -132,15 +140,12 @@ class CerraClient:
                 else:
                     raise
 
-            req = AtomicRequest(
+            yield AtomicRequest(
                 name=name,
                 dataset="reanalysis-cerra-height-levels",
                 data=r,
                 built_data=built_data
             )
-            reqs.append(req)
-
-        return reqs
 
     def prepare_wind_request(self, year: int | Collection[int], month: int | Collection[int]):
         return self.prepare_request(
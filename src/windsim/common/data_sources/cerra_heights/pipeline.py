@@ -1,5 +1,4 @@
 import shutil
-import subprocess
 from collections.abc import Collection
 from pathlib import Path
 from tempfile import TemporaryDirectory
@@ -29,21 +28,20 @@ async def run_pipeline(
     temp_folder: Path | str | None = None,
     api_key: str | None = None,
     request_workers: int = 10,
-    processing_workers: int = 1,
+    download_workers: int = 1,
+    convert_workers: int = 1,
     max_waiting_results: int | None = None,  # Max submitted-but-not-downloaded
     skip_existing: bool = True
 ):
     """
     - download as GRIB
-    - convert to NetCDF using xarray
-    - Rechunk using nccopy
+    - convert to chunked and compressed NetCDF using xarray
 
 
     - send multiple download requests so that they are queued
-    - Then spawn multiple processes, each:
+    - Then spawn two stages of workers, connected by a queue, so that downloads and conversions overlap:
         - download GRIB file
-        - convert to netCDF
-        - rechunk and compress
+        - convert to chunked and compressed netCDF
     """
 
     # Resolve paths
@@ -53,13 +51,6 @@ async def run_pipeline(
         temp_folder = Path(temp_folder).resolve()
         temp_folder.mkdir(exist_ok=True)
 
-
-    # Ensure nccopy is installed
-    try:
-        subprocess.run(['nccopy'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except FileNotFoundError:
-        raise RuntimeError("Cannot find nccopy")
-
     # Create semaphore to track not-yet-downloaded/waiting results
     if max_waiting_results is None:
         max_waiting_results = request_workers
@@ -67,17 +58,19 @@ async def run_pipeline(
         raise ValueError(f"max_waiting_results must be at least request_workers")
 
     # Queues for work items
-    submit_queue = asyncio.Queue[AtomicRequest]()  # All atomic requests
+    submit_queue = asyncio.Queue[AtomicRequest](maxsize=request_workers)  # Atomic requests, filled lazily
     download_queue = asyncio.Queue[Result]()  # Ready to download
+    convert_queue = asyncio.Queue[tuple[Result, Path]]()  # Downloaded, ready to convert
     
     # Semaphore tracks "in-flight" requests across stages
     waiting_results_sem = asyncio.Semaphore(max_waiting_results)
 
     client = CerraClient(api_key=api_key)
 
-    # Fill submit queue
-    for req in client.prepare_wind_request(year=year, month=month):
-        await submit_queue.put(req)
+    async def produce_requests():
+        """Fill submit queue as atomic requests are generated, blocking while it is full."""
+        for req in client.prepare_wind_request(year=year, month=month):
+            await submit_queue.put(req)
 
     async def submit_worker():
         """Submit requests, respecting in-flight limit."""
@@ -101,39 +94,68 @@ async def run_pipeline(
                 submit_queue.task_done()
 
     async def download_worker(tmpdir: Path):
-        """Download results and release semaphore."""
+        """Download results and hand them over to conversion."""
         while True:
             result = await download_queue.get()
             print(f"Processing result: {result}")
 
+            handed_over = False
             try:
-                await _download_and_process(
+                grib = await _download(
                     result,
                     tmpdir=tmpdir,
                     folder=folder,
-                    area=area,
                     skip_existing=skip_existing
                 )
+                if grib is not None:
+                    await convert_queue.put((result, grib))
+                    handed_over = True
+            except Exception as e:
+                print(f"Download failed for {result.name}: {e}")
+            finally:
+                if not handed_over:
+                    waiting_results_sem.release()  # Release if nothing left to do
+                download_queue.task_done()
+
+    async def convert_worker(tmpdir: Path):
+        """Convert downloaded results and release semaphore."""
+        while True:
+            result, grib = await convert_queue.get()
+
+            try:
+                await _convert(
+                    result,
+                    grib,
+                    tmpdir=tmpdir,
+                    folder=folder,
+                    area=area
+                )
                 print(f"Finished processing result: {result}")
             except Exception as e:
                 print(f"Processing failed for {result.name}: {e}")
             finally:
                 waiting_results_sem.release()  # Always release
-                download_queue.task_done()
+                convert_queue.task_done()
     
     # Start workers
     with TemporaryDirectory(dir=temp_folder) as tmpdir:
         tmpdir = Path(tmpdir)
 
+        producer_task = asyncio.create_task(produce_requests())
         submit_tasks = [
             asyncio.create_task(submit_worker())
             for _ in range(request_workers)
         ]
         download_tasks = [
             asyncio.create_task(download_worker(tmpdir)) 
-            for _ in range(processing_workers)
+            for _ in range(download_workers)
+        ]
+        convert_tasks = [
+            asyncio.create_task(convert_worker(tmpdir))
+            for _ in range(convert_workers)
         ]
 
+        await producer_task
         await submit_queue.join()
         for t in submit_tasks:
             t.cancel()
@@ -142,45 +164,58 @@ async def run_pipeline(
         for t in download_tasks:
             t.cancel()
 
+        await convert_queue.join()
+        for t in convert_tasks:
+            t.cancel()
+
     print("Pipeline finished")
 
 
-async def _download_and_process(result: Result, *, tmpdir: Path, folder: Path, area: Area | None = None, skip_existing: bool = True):
+async def _download(result: Result, *, tmpdir: Path, folder: Path, skip_existing: bool = True) -> Path | None:
+    """Download the GRIB file of a result. Returns `None` if the final file already exists."""
     grib = tmpdir / f"{result.name}.grib"
-    contiguous_clipped_netcdf = tmpdir / f"{result.name}-contiguous-clipped.nc"
-    chunked_netcdf = tmpdir / f"{result.name}-chunked.nc"
     final_netcdf = folder / f"{result.name}.nc"
 
     if skip_existing and final_netcdf.exists():
         print(f"Skipping existing file: {final_netcdf.name}")
-        return
+        return None
 
     # Download GRIB file
     print(f"Downloading GRIB file: {result.name}")
     await result.download(grib, temp_folder=tmpdir)
+    return grib
+
 
-    # Convert to unchunked, uncompressed netCDF
-    print(f"Converting GRIB to spatially subset netCDF: {result.name}")
-    await asyncio.to_thread(
-        grib_to_netcdf, grib, contiguous_clipped_netcdf, temp_folder=tmpdir, area=area
-    )
-    await asyncio.to_thread(grib.unlink)
+async def _convert(result: Result, grib: Path, *, tmpdir: Path, folder: Path, area: Area | None = None):
+    final_netcdf = folder / f"{result.name}.nc"
 
-    # Chunk and compress netCDF
-    print(f"Chunking and compressing netCDF: {result.name}")
-    await asyncio.to_thread(
-        chunk_compress_netcdf, contiguous_clipped_netcdf, chunked_netcdf, temp_folder=tmpdir
-    )
-    await asyncio.to_thread(contiguous_clipped_netcdf.unlink)
+    # Convert to spatially subset, chunked and compressed netCDF in a single write
+    print(f"Converting GRIB to chunked and compressed netCDF: {result.name}")
+    try:
+        await asyncio.to_thread(
+            grib_to_final_netcdf, grib, final_netcdf, temp_folder=tmpdir, area=area
+        )
+    finally:
+        await asyncio.to_thread(grib.unlink)
 
     print(f"Finished processing: {result.name}")
-    await asyncio.to_thread(
-        shutil.move, chunked_netcdf, final_netcdf
-    )
 
 
-def grib_to_netcdf(source: Path | str, dest: Path | str, temp_folder: Path | str | None = None, area: Area | None = None):
-    """Convert GRIB file to unchunked, uncompressed netCDF file."""
+def grib_to_final_netcdf(
+    source: Path | str,
+    dest: Path | str,
+    temp_folder: Path | str | None = None,
+    area: Area | None = None,
+    chunking: dict[str, int] | None = None,
+    compression_level: int = 4
+):
+    """Convert GRIB file to chunked and compressed netCDF file.
+
+    Dimensions missing from `chunking` are stored in a single chunk.
+    """
+    if chunking is None:
+        chunking = dict(time=24, x=32, y=32)
+
     # Resolve paths
     source = Path(source).resolve()
     dest = Path(dest).resolve()
@@ -188,110 +223,43 @@ def grib_to_netcdf(source: Path | str, dest: Path | str, temp_folder: Path | str
         temp_folder = Path(temp_folder).resolve()
         temp_folder.mkdir(exist_ok=True)
 
-    # Open GRIB file.
+    # Open GRIB file once and close it after writing.
+    # Align dask chunks with the on-disk time chunks so that every compressed chunk is written exactly once.
     # Do not chunk spatial dims as full grid needs to be loaded anyway.
-    ds = xr.open_dataset(
+    with xr.open_dataset(
         source,
         engine="cfgrib",
         decode_timedelta=True,
-        chunks=dict(time=1, x=-1, y=-1),
+        chunks=dict(time=chunking.get('time', -1), x=-1, y=-1),
         backend_kwargs=dict(
             indexpath='',  # disable creation of index file
         )
-    )
-
-    # Clip to area
-    if area is not None:
-        ds = clip_dataset(ds, area=area, buffer=3)
-
-    with TemporaryDirectory(dir=temp_folder) as tmpdir:
-        tmpdir = Path(tmpdir)
-        tmpdest = tmpdir / dest.name
-
-        # Convert to netCDF without specifying encoding, thus preserving all metadata.
-        ds.to_netcdf(tmpdest, engine="netcdf4", format="NETCDF4")
-        shutil.move(tmpdest, dest)
-
-
-def nccopy(
-    source: Path | str,
-    dest: Path | str,
-    compression_level: int | None = None,
-    chunking: dict[str, int] | None = None,
-    copy_buffer: int | str | None = None,
-    chunk_cache: int | str | None = None,
-    cache_elems: int | str | None = None
-):
-    source = Path(source).resolve()
-    dest = Path(dest).resolve()
-
-    # Build full chunking specs
-    print("Reading source file metadata")
-    full_chunking: dict[str, int | None] | None = None
-    if chunking is not None:
-        full_chunking = {}
-        with xr.open_dataset(
-            source,
-            engine="netcdf4",
-            decode_times=False,
-            decode_timedelta=False,
-        ) as ds:
-            for dim in ds.dims:
-                assert isinstance(dim, str)
-                full_chunking[dim] = chunking.get(dim, None)
-
-    # Build command
-    cmd = ['nccopy']
-
-    cmd += ['-k', 'netCDF-4']
-
-    if copy_buffer is not None:
-        cmd += ['-m', str(copy_buffer)]
-    if chunk_cache is not None:
-        cmd += ['-h', str(chunk_cache)]
-    if cache_elems is not None:
-        cmd += ['-e', str(cache_elems)]
-
-    if compression_level is not None:
-        cmd += ['-d', str(compression_level)]
-
-    if full_chunking is not None:
-        print("Chunking:", full_chunking)
-        chunk_str = ','.join(
-            f"{dim}/{size if size is not None else ''}"
-            for dim, size in full_chunking.items()
-        )
-        cmd += ['-c', chunk_str]
+    ) as ds:
+        # Clip to area
+        if area is not None:
+            ds = clip_dataset(ds, area=area, buffer=3)
+
+        # Only pass storage hints, so all other metadata is preserved.
+        # Chunks must not be larger than the (possibly clipped) dimensions.
+        encoding = {
+            name: dict(
+                zlib=True,
+                complevel=compression_level,
+                shuffle=True,
+                chunksizes=tuple(
+                    min(chunking.get(str(dim), size), size)
+                    for dim, size in zip(var.dims, var.shape)
+                )
+            )
+            for name, var in ds.data_vars.items()
+        }
 
-    cmd += [str(source), str(dest)]
+        with TemporaryDirectory(dir=temp_folder) as tmpdir:
+            tmpdir = Path(tmpdir)
+            tmpdest = tmpdir / dest.name
 
-    print(f"Running nccopy command: {' '.join(cmd)}")
-    subprocess.run(cmd, check=True)
-
-
-def chunk_compress_netcdf(source: Path | str, dest: Path | str, temp_folder: Path | str | None = None):
-    """Chunk and compress netCDF file."""
-    # Resolve paths
-    source = Path(source).resolve()
-    dest = Path(dest).resolve()
-    if temp_folder is not None:
-        temp_folder = Path(temp_folder).resolve()
-        temp_folder.mkdir(exist_ok=True)
-
-    with TemporaryDirectory(dir=temp_folder) as tmpdir:
-        tmpdir = Path(tmpdir)
-        tmpdest = tmpdir / dest.name
-
-        nccopy(
-            source,
-            tmpdest,
-            compression_level=4,
-            chunking=dict(time=24, x=32, y=32),
-            copy_buffer='1G',
-            chunk_cache=0,
-            cache_elems=0
-        )
-        shutil.move(tmpdest, dest)
+            ds.to_netcdf(tmpdest, engine="netcdf4", format="NETCDF4", encoding=encoding)
+            shutil.move(tmpdest, dest)
 
 
 def clip_dataset(ds: xr.Dataset, area: Area, buffer: int = 0):
@@ -302,11 +270,15 @@ def clip_dataset(ds: xr.Dataset, area: Area, buffer: int = 0):
     xmin, ymin, xmax, ymax = area['xmin'], area['ymin'], area['xmax'], area['ymax']
     lat, lon = ds['latitude'], ds['longitude']
 
-    # Create mask for the area of interest
-    mask = (lat >= ymin) & (lat <= ymax) & (lon >= xmin) & (lon <= xmax)
-
-    # Find the bounding indices
-    y_inds, x_inds = np.where(mask)
+    if lat.ndim == 1 and lon.ndim == 1:
+        # Rectilinear grid: bounds can be found per axis
+        y_inds = np.flatnonzero((lat.values >= ymin) & (lat.values <= ymax))
+        x_inds = np.flatnonzero((lon.values >= xmin) & (lon.values <= xmax))
+    else:
+        # Curvilinear grid: create mask for the area of interest and project it onto each axis
+        mask = (lat >= ymin) & (lat <= ymax) & (lon >= xmin) & (lon <= xmax)
+        y_inds = np.flatnonzero(mask.any(dim='x').values)
+        x_inds = np.flatnonzero(mask.any(dim='y').values)
 
     if y_inds.size == 0 or x_inds.size == 0:
         raise ValueError("No points found within the specified lat/lon bounds.")
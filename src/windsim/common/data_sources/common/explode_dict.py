@@ -1,5 +1,5 @@
 from itertools import product
-from collections.abc import Mapping
+from collections.abc import Iterator, Mapping
 
 
 type OneOrMany[T] = T | list[T] | tuple[T] | set[T] | frozenset[T]
@@ -18,12 +18,14 @@ def each[T](*args: T) -> ProductDimension[T]:
 type Explodable[T] = T | ProductDimension[T]
 
 
-def explode[T](request: Mapping[str, Explodable[T]]) -> list[dict[str, T]]:
+def explode[T](request: Mapping[str, Explodable[T]]) -> Iterator[dict[str, T]]:
+    """Lazily yield all combinations of the product dimensions in `request`."""
     def as_product_dimension(values: Explodable[T]) -> ProductDimension[T]:
         if isinstance(values, ProductDimension):
             return ProductDimension(values)
         return ProductDimension([values])
 
     dimensions = (as_product_dimension(values) for values in request.values())
-    exploded_requests = [dict(zip(request.keys(), values)) for values in product(*dimensions)]
-    return exploded_requests
+    keys = tuple(request.keys())
+    for values in product(*dimensions):
+        yield dict(zip(keys, values))
@@ -1,5 +1,6 @@
 import logging
 import math
+import os
 import re
 import time
 from pathlib import Path
@@ -135,8 +136,11 @@ def fetch_tiles(tiles_df, folder: Path | str):
 
 def get_existing_tiles(folder: Path | str):
     folder = Path(folder).resolve()
+    # Only raw names are needed, so avoid constructing a Path per file
+    with os.scandir(folder) as it:
+        rows = [(e.name, parse_tilename(e.name)) for e in it if e.name.endswith('.tif')]
     existing_df = pd.DataFrame(
-        [(f.name, parse_tilename(f.name)) for f in folder.iterdir()],
+        rows,
         columns=['filename', 'lonlat']
     ).set_index('lonlat')
     return existing_df
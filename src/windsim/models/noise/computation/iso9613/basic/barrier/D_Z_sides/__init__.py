@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+import math
 from typing import Any, Literal, Type, cast, overload
 
 import numpy as np
@@ -13,7 +14,9 @@ from trimesh.path import Path2D, Path3D
 
 # from ..render_3d import render_3d
 from ..plot_2d import plot_2d
+from ..utils import is_obstructed
 from .general import D_Z_general_ufunc
+from .shared import UNBLOCKED_PARTS, calc_from_parts
 
 
 def D_Z_sides_mapblock(
@@ -41,31 +44,30 @@ def D_Z_ufunc(
     barriers: Trimesh,
 ) -> npt.NDArray:
     """Computes barrier attenuation along sides for all turbine-receiver pairs.
-    Uses `blocked_mask` to filter out pairs whose direct path is not blocked.
+    Pairs without barriers between turbine and receiver are filtered out early,
+    as their direct line cannot be blocked. Only the remaining pairs are sliced.
     """
-    # Broadcast manually
-    turbines, receivers = np.broadcast_arrays(
-        turbines[..., :, np.newaxis, :],
-        receivers[..., np.newaxis, :, :],
-    )
-    pairs = np.stack([turbines, receivers], -2)
+    # Flatten leading dimensions, but keep turbines and receivers separate.
+    # Pairs are addressed by flat index, so their positions are only gathered where needed.
+    batch_shape = np.broadcast_shapes(turbines.shape[:-2], receivers.shape[:-2])
+    turbines = np.broadcast_to(turbines, (*batch_shape, *turbines.shape[-2:])).reshape(-1, *turbines.shape[-2:])
+    receivers = np.broadcast_to(receivers, (*batch_shape, *receivers.shape[-2:])).reshape(-1, *receivers.shape[-2:])
+    pairs_shape = (len(turbines), turbines.shape[-2], receivers.shape[-2])
 
-    # Stack
-    pairs_stacked = pairs.reshape(-1, 2, 3)
-    # blocked_mask_stacked = blocked_mask.reshape(-1)
-    # pairs_blocked_stacked = pairs_stacked[blocked_mask_stacked]
+    def positions(indices: npt.NDArray) -> tuple[npt.NDArray, npt.NDArray]:
+        b, t, r = np.unravel_index(indices, pairs_shape)
+        return turbines[b, t], receivers[b, r]
 
-    # Compute result
-    result_stacked = D_Z_general_ufunc(
-        pairs_stacked[:,0], pairs_stacked[:,1], frequencies, barriers
-    )
+    result_stacked = np.empty((math.prod(pairs_shape), 2, len(frequencies)))
+    obstructed_mask = is_obstructed(*positions(np.arange(len(result_stacked))), barriers)
 
-    # result_stacked = np.empty((len(pairs_stacked), 2, len(frequencies)))
-    # result_stacked[~blocked_mask_stacked] = 0
-    # if pairs_blocked_stacked.size > 0:
-    #     result_stacked[blocked_mask_stacked] = D_Z_general_ufunc(
-    #         pairs_blocked_stacked[:,0], pairs_blocked_stacked[:,1], frequencies, barriers
-    #     )
+    # Both sides of unobstructed pairs share the same constant attenuation
+    result_stacked[~obstructed_mask] = calc_from_parts(*UNBLOCKED_PARTS, frequencies)
+
+    # Compute result for remaining pairs
+    result_stacked[obstructed_mask] = D_Z_general_ufunc(
+        *positions(np.flatnonzero(obstructed_mask)), frequencies, barriers
+    )
 
     # Unstack
-    return result_stacked.reshape((*turbines.shape[:-1], 2, len(frequencies)))
+    return result_stacked.reshape((*batch_shape, *pairs_shape[1:], 2, len(frequencies)))
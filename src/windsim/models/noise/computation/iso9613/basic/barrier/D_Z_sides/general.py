@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import logging
+from collections import defaultdict
 from typing import Any, Literal, Type, cast, overload
 
 import numpy as np
 import numpy.typing as npt
+import shapely
 import shapely.ops
 import trimesh
 import xarray as xr
@@ -15,9 +17,9 @@ from trimesh.path import Path2D, Path3D
 # from ..render_3d import render_3d
 from ..align_plane import align_plane_transform
 from ..plot_2d import plot_2d
-from ..utils import PATHS, section_to_polygons, slice_barriers
+from ..utils import path_lengths, plane_keys, polygons_to_point_arrays, section_to_polygons_batch, slice_barriers
 from .get_paths import get_paths
-from .shared import calc_from_parts
+from .shared import MISSING_PARTS, UNBLOCKED_PARTS, Parts, calc_from_parts
 
 ORIGIN = np.array([0,0,0])
 X_AXIS = np.array([1,0,0])
@@ -33,64 +35,116 @@ def D_Z_general_ufunc(
 ) -> npt.NDArray:
     """General computation of D_Z.
 
-    This function is vectorized through `np.vectorize`, which is essentially a Python for loop,
-    and is thus very slow."""
-    if turbine.size == 0:
-        return np.zeros((len(turbine)*len(receiver),2,len(frequencies)), dtype=np.float64)
+    Each turbine-receiver pair requires a section through the barriers.
+    Pairs are grouped by their section plane, so that each group is sliced and transformed once.
 
-    func = np.vectorize(
-        _calc_unvectorized,
-        signature='(3),(3),(f),()->(2,f)',
-        otypes=[np.float64]
-    )
+    Parameters
+    ---------
+    turbine : (n,3)
+        Turbine positions.
+    receiver : (n,3)
+        Receiver positions.
+
+    Returns
+    -------
+    D_Z : (n,2,f)
+    """
+    # The plane only depends on the turbine and the direction towards the receiver
+    groups: dict[bytes, list[int]] = defaultdict(list)
+    for i, key in enumerate(plane_keys(turbine, receiver - turbine)):
+        groups[key].append(i)
+
+    # Slice and transform the EL planes of all groups, such that receivers are right from turbine
+    firsts = [indices[0] for indices in groups.values()]
+    sections = _slice_all(turbine[firsts], receiver[firsts], barriers)
 
-    return func(turbine, receiver, frequencies, barriers)
+    # Determine parts per pair and side, then compute D_Z for all pairs, sides and frequencies at once
+    parts = np.empty((len(turbine), 2, 3), dtype=np.float64)
+    for indices, section in zip(groups.values(), sections):
+        parts[indices] = _calc_group(turbine[indices], receiver[indices], section)
+    z, e, K_met = np.moveaxis(parts, -1, 0)
+    return calc_from_parts(z, e, K_met, frequencies)
 
 
-def _calc_unvectorized(
+type Section = tuple[list[Polygon], STRtree, npt.NDArray, npt.NDArray, npt.NDArray]
+
+
+def _slice_all(s: npt.NDArray, r: npt.NDArray, barriers: Trimesh) -> list[Section]:
+    """Slices the barriers along the EL planes of the pairs `s` and `r` of shape (n,3)
+    and transforms them, such that each receiver is right from its turbine.
+    The section vertices of all planes are transformed at once.
+
+    Returns
+    -------
+    sections
+        Per plane, the flattened polygons, their index tree, the transformation matrix,
+        the exterior points of all polygons and the polygon index of each point.
+    """
+    flattens = np.empty((len(s), 4, 4))
+    sections_3d: list[Path3D | None] = []
+    for i, vec_sr in enumerate(r - s):
+        _normal_EV = np.cross(vec_sr, Z_AXIS)
+        normal = np.cross(vec_sr, _normal_EV)
+        flattens[i] = align_plane_transform(normal=normal, point=s[i], align_y=Y_AXIS, direction_x=vec_sr)
+        sections_3d.append(cast(Path3D | None, barriers.section(plane_normal=normal, plane_origin=s[i])))
+
+    sections: list[Section] = []
+    for polygons, flatten in zip(section_to_polygons_batch(sections_3d, flattens), flattens):
+        points, point_ids = polygons_to_point_arrays(polygons)
+        sections.append((polygons, STRtree(polygons), flatten, points, point_ids))
+    return sections
+
+
+def _calc_group(
     turbine: npt.NDArray,
     receiver: npt.NDArray,
-    frequencies: npt.NDArray,
-    barriers: Trimesh
+    section: Section
 ) -> npt.NDArray:
-    """Computes barrier attenuation along sides for a turbine-receiver pair whose direct path
-    is blocked by barriers.
+    """Computes the parts of the barrier attenuation along sides for turbine-receiver pairs
+    that share the same EL plane.
 
     Parameters
     --------
-    turbine : (3)
-        Turbine position.
-    receicer : (3)
-        Receiver position.
-    frequency : (f)
-        Octave frequencies.
-    barriers
-        Barriers.
+    turbine : (k,3)
+        Turbine positions.
+    receiver : (k,3)
+        Receiver positions.
+    section
+        Section of the barriers in the shared EL plane.
     
     Returns
     --------
-    D_Z : (2,f)
-        Barrier attenuation for the turbine-receiver pair and each octave frequency.
-        First axis is (left, right).
+    parts : (k,2,3)
+        Parts of the barrier attenuation for the (left, right) side of each turbine-receiver pair.
     """
-    s, r = turbine, receiver
-
-    # determine vectors
-    vec_sr = r-s
-    _normal_EV = np.cross(vec_sr, Z_AXIS)
-    normal = np.cross(vec_sr, _normal_EV)
-
-    # Slice and transform EL plane, such that receiver is right from turbine.
-    flatten = align_plane_transform(normal=normal, point=s, align_y=Y_AXIS, direction_x=vec_sr)
-    section_3d = cast(Path3D | None, barriers.section(plane_normal=normal, plane_origin=s))
-    polygons = section_to_polygons(section_3d, flatten) if section_3d is not None else []
-    s_flat, r_flat = trimesh.transform_points([s, r], flatten)[:, :2]
-
-    return _calc_unvectorized_flat(s_flat, r_flat, polygons, frequencies)
-
-
-def _calc_unvectorized_flat(s, r, polygons: list[Polygon], frequencies: npt.NDArray) -> npt.NDArray:
-    """Compute D_Z in the plane.
+    polygons, tree, flatten, points, point_ids = section
+
+    # Transform all pairs of the group at once. Only the in-plane coordinates are needed.
+    flat = np.concatenate([turbine, receiver]) @ flatten[:2, :3].T + flatten[:2, 3]
+    s_flat, r_flat = flat[:len(turbine)], flat[len(turbine):]
+
+    # Find polygons crossing the direct lines of all pairs in a single query
+    lines = shapely.linestrings(np.stack([s_flat, r_flat], axis=1))
+    line_indices, polygon_indices = tree.query(lines, predicate='crosses')
+    order = np.argsort(line_indices, kind='stable')
+    line_indices, polygon_indices = line_indices[order], polygon_indices[order]
+    crossing_indices = np.split(polygon_indices, np.searchsorted(line_indices, np.arange(1, len(lines))))
+
+    return np.array([
+        _calc_unvectorized_flat(s, r, tree, points, point_ids, crossing)
+        for s, r, crossing in zip(s_flat, r_flat, crossing_indices)
+    ], dtype=np.float64).reshape(-1, 2, 3)
+
+
+def _calc_unvectorized_flat(
+    s,
+    r,
+    tree: STRtree,
+    points: npt.NDArray,
+    point_ids: npt.NDArray,
+    crossing_indices: npt.NDArray
+) -> tuple[Parts, Parts]:
+    """Compute the parts of D_Z in the plane.
     
     Parameters
     ---------
@@ -98,56 +152,40 @@ def _calc_unvectorized_flat(s, r, polygons: list[Polygon], frequencies: npt.NDAr
         Tturbine position in EL plane.
     r : (2,)
         Receiver position in EL plane.
-    polygons
-        Polygons in the EL plane.
-    frequencies
-        Octave frequencies.
+    tree
+        Index tree of the polygons in the EL plane.
+    points : (e,2)
+        Exterior points of all polygons.
+    point_ids : (e,)
+        Index of the polygon that each point belongs to.
+    crossing_indices
+        Indices of the polygons that cross the direct line.
 
     Returns
     --------
-    D_Z : (2,f)
+    parts
+        Parts for the (left, right) side.
     """
-
-    line = LineString([s, r])
     d = np.linalg.norm(r - s)
-    tree = STRtree(polygons)
 
     # Check if direct path is blocked.
-    is_blocked = tree.query(line, 'crosses').size > 0
-
-    if not is_blocked:
+    if crossing_indices.size == 0:
         # Direct line is unblocked.
-        v = calc_from_parts(
-            z=0,
-            e=0,
-            K_met=1,
-            frequencies=frequencies
-        )
-        return np.vstack([v, v])
+        return UNBLOCKED_PARTS, UNBLOCKED_PARTS
     
     # There are barriers between turbine and receiver that block the direct line.
     # Determine paths.
-    left_path, right_path = get_paths(s, r, polygons, tree)
+    left_path, right_path = get_paths(s, r, tree, points, point_ids, crossing_indices)
 
-    def process_path(path: LineString | None) -> npt.NDArray:
+    def process_path(path: LineString | None) -> Parts:
         if path is None:
-            return np.full(len(frequencies), np.nan)
-
-        if len(path.coords) > 3:
-            e = LineString(path.coords[1:-1]).length
-        else:
-            e = 0
-        d_ss = LineString(path.coords[:2]).length
-        d_sr = LineString(path.coords[-2:]).length
+            return MISSING_PARTS
+
+        d_ss, d_sr, e = path_lengths(np.asarray(path.coords))
         z = (d_ss + d_sr + e) - d
 
         K_met = 1
 
-        return calc_from_parts(
-            z=z,
-            e=e,
-            K_met=K_met,
-            frequencies=frequencies
-        )
+        return z, e, K_met
     
-    return np.vstack([process_path(left_path), process_path(right_path)])
+    return process_path(left_path), process_path(right_path)
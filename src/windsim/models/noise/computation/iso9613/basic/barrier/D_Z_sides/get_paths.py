@@ -14,13 +14,19 @@ from shapely.plotting import plot_line, plot_polygon
 from shapely.strtree import STRtree
 
 from ..utils import (PropagationPathError, hull_path, hull_ring,
-                     polygons_to_points, validate_path)
+                     validate_path)
 
 log = logging.getLogger(__name__)
 
 
-def get_paths(s, r, polygons: Iterable[Polygon], tree: STRtree) \
-    -> tuple[LineString | None, LineString | None]:
+def get_paths(
+    s,
+    r,
+    tree: STRtree,
+    points: npt.NDArray,
+    point_ids: npt.NDArray,
+    crossing_indices: npt.NDArray | None = None
+) -> tuple[LineString | None, LineString | None]:
     """Constructs the two lateral paths for a turbine-receiver pair where the direct line is blocked.
     
     Parameters
@@ -29,31 +35,35 @@ def get_paths(s, r, polygons: Iterable[Polygon], tree: STRtree) \
         Turbine.
     r
         Receiver.
-    polygons
-        Collection of polygons.
     tree
-        Index tree, used for fast polygon lookup.
+        Index tree of the polygons, used for fast polygon lookup.
+    points : (e,2)
+        Exterior points of all polygons.
+    point_ids : (e,)
+        Index of the polygon that each point belongs to.
+    crossing_indices
+        Indices of the polygons that cross the direct line, if already known.
     """
 
-    polygons = np.asarray(polygons)
     line = LineString([s, r])
     vec_sr = r - s
 
     # Construct initial convex hulls from polygons that cross the direct line.
     # Only add points above/below the segment.
-    _crossing_polys = tree.geometries[tree.query(line, 'crosses')]
-    points = polygons_to_points(_crossing_polys)
-    _cross = np.cross(vec_sr, points)
-    points_left = points[_cross > 0]
-    points_right = points[_cross < 0]
+    if crossing_indices is None:
+        crossing_indices = tree.query(line, 'crosses')
+    _crossing_points = points[np.isin(point_ids, crossing_indices)]
+    _cross = vec_sr[0] * _crossing_points[:, 1] - vec_sr[1] * _crossing_points[:, 0]
+    points_left = _crossing_points[_cross > 0]
+    points_right = _crossing_points[_cross < 0]
     assert len(points_left) > 0 and len(points_right) > 0
 
     left_hull = ConvexHull(np.vstack([s, r, points_left]), incremental=True)
     right_hull = ConvexHull(np.vstack([s, r, points_right]), incremental=True)
 
     # construct the top and bottom propagation paths
-    left_path = _get_path(s, r, polygons, tree, left_hull)
-    right_path = _get_path(s, r, polygons, tree, right_hull)
+    left_path = _get_path(s, r, tree, points, point_ids, left_hull)
+    right_path = _get_path(s, r, tree, points, point_ids, right_hull)
 
     return left_path, right_path
 
@@ -61,8 +71,9 @@ def get_paths(s, r, polygons: Iterable[Polygon], tree: STRtree) \
 def _get_path(
     s,
     r,
-    polygons: npt.NDArray,
     tree: STRtree,
+    points: npt.NDArray,
+    point_ids: npt.NDArray,
     hull: ConvexHull,
 ) -> LineString | None:
     """Given a convex hull that represents a single propagation path,
@@ -81,7 +92,7 @@ def _get_path(
 
     while len(cross_path_indices) > 0:
         # add intersecting polygons to hull
-        hull.add_points(polygons_to_points(polygons[cross_path_indices]))
+        hull.add_points(points[np.isin(point_ids, cross_path_indices)])
         # check for crossing polygons, but exclude those on the direct line segment
         path = hull_path(hull, segment_between)
         cross_path_indices = tree.query(path, 'crosses')
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import logging
+import math
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Literal, Type, cast, overload
 
 import numpy as np
@@ -9,6 +11,7 @@ import numpy.typing as npt
 import xarray as xr
 from trimesh import Trimesh
 
+from ..utils import is_obstructed
 from .general import D_Z_general_ufunc
 from .unblocked import D_Z_unblocked_ufunc
 
@@ -38,37 +41,44 @@ def D_Z_ufunc(
     receivers: npt.NDArray,
     frequencies: npt.NDArray,
     barriers: Trimesh,
+    max_workers: int = 1,
 ) -> npt.NDArray:
     """Computes barrier attenuation over the top for all turbine-receiver pairs.
-    Uses `blocked_mask` to filter out pairs whose direct path is not blocked.
-    """
-    # Broadcast manually
-    turbines, receivers = np.broadcast_arrays(
-        turbines[..., :, np.newaxis, :],
-        receivers[..., np.newaxis, :, :],
-    )
-    pairs = np.stack([turbines, receivers], -2)
-
-    # Stack
-    pairs_stacked = pairs.reshape(-1, 2, 3)
-    # blocked_mask_stacked = blocked_mask.reshape(-1)
-    # pairs_blocked_stacked = pairs_stacked[blocked_mask_stacked]
-
-    # Compute result
-    result_stacked = D_Z_general_ufunc(
-        pairs_stacked[:,0], pairs_stacked[:,1], frequencies, barriers
-    )
-
-    # result_stacked = np.empty((len(pairs_stacked), len(frequencies)))
+    Pairs without barriers between turbine and receiver are filtered out early,
+    only the remaining pairs are sliced.
 
-    # result_stacked[~blocked_mask_stacked] = D_Z_unblocked(frequencies)
-
-    # if pairs_blocked_stacked.size > 0:
-    #     result_stacked[blocked_mask_stacked] = D_Z_blocked_ufunc(
-    #         pairs_blocked_stacked[:,0], pairs_blocked_stacked[:,1], frequencies, barriers
-    #     )
+    Those pairs are independent of each other and can be split into one chunk per worker thread.
+    Slicing, Shapely and the compiled kernels release the GIL for most of their work.
+    By default, a single thread is used, since this runs within dask tasks that already
+    occupy one thread each of the worker's thread budget.
+    """
+    # Flatten leading dimensions, but keep turbines and receivers separate.
+    # Pairs are addressed by flat index, so their positions are only gathered where needed.
+    batch_shape = np.broadcast_shapes(turbines.shape[:-2], receivers.shape[:-2])
+    turbines = np.broadcast_to(turbines, (*batch_shape, *turbines.shape[-2:])).reshape(-1, *turbines.shape[-2:])
+    receivers = np.broadcast_to(receivers, (*batch_shape, *receivers.shape[-2:])).reshape(-1, *receivers.shape[-2:])
+    pairs_shape = (len(turbines), turbines.shape[-2], receivers.shape[-2])
+
+    def positions(indices: npt.NDArray) -> tuple[npt.NDArray, npt.NDArray]:
+        b, t, r = np.unravel_index(indices, pairs_shape)
+        return turbines[b, t], receivers[b, r]
+
+    result_stacked = np.empty((math.prod(pairs_shape), len(frequencies)))
+    obstructed_mask = is_obstructed(*positions(np.arange(len(result_stacked))), barriers)
+    result_stacked[~obstructed_mask] = D_Z_unblocked_ufunc(frequencies)
+
+    # Compute result for remaining pairs, sharing sections between threads
+    sections = {}
+
+    def compute_chunk(indices: npt.NDArray) -> npt.NDArray:
+        return D_Z_general_ufunc(*positions(indices), frequencies, barriers, sections)
+
+    if max_workers == 1:
+        result_stacked[obstructed_mask] = compute_chunk(np.flatnonzero(obstructed_mask))
+    else:
+        chunks = np.array_split(np.flatnonzero(obstructed_mask), max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            result_stacked[obstructed_mask] = np.concatenate(list(executor.map(compute_chunk, chunks)))
 
     # Unstack
-    return result_stacked.reshape((*turbines.shape[:-1], len(frequencies)))
-
-
+    return result_stacked.reshape((*batch_shape, *pairs_shape[1:], len(frequencies)))
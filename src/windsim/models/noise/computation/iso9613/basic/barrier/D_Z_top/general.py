@@ -1,14 +1,18 @@
 from __future__ import annotations
 
 import logging
+import math
+import threading
+from collections import defaultdict
 from collections.abc import Callable
-from typing import Any, Literal, Type, cast, overload
+from typing import Any, Literal, NamedTuple, Type, cast, overload
 
 import numpy as np
 import numpy.typing as npt
 import shapely.ops
 import trimesh
 import xarray as xr
+from numba import njit
 from shapely import LineString, Polygon
 from shapely.errors import GEOSException
 from trimesh import Trimesh
@@ -17,39 +21,131 @@ from trimesh.path import Path2D, Path3D
 # from ..render_3d import render_3d
 from ..align_plane import align_plane_transform
 from ..plot_2d import plot_2d
-from ..utils import PATHS, polygons_to_points, section_to_polygons
+from ..utils import faces_along, path_lengths, plane_keys, polygons_to_point_arrays, section_to_polygons
 from .get_path import get_path
-from .shared import Z_AXIS, calc_from_parts
+from .shared import MISSING_PARTS, UNBLOCKED_PARTS, Z_AXIS, Parts, calc_from_parts
 
 log = logging.getLogger(__name__)
 
+# Guards replacing entries of section caches that are shared between threads
+_SECTIONS_LOCK = threading.Lock()
+
 
 def D_Z_general_ufunc(
     turbine: npt.NDArray,
     receiver: npt.NDArray,
     frequencies: npt.NDArray,
-    barriers: Trimesh
+    barriers: Trimesh,
+    sections: dict[bytes, tuple[float, Section | None]] | None = None
 ) -> npt.NDArray:
     """General computation of D_Z.
 
-    This function is vectorized through `np.vectorize`, which is essentially a Python for loop,
-    and is thus very slow."""
-    func = np.vectorize(
-        _calc_unvectorized,
-        signature='(3),(3),(f),()->(f)',
-        otypes=[np.float64]
-    )
+    Each turbine-receiver pair requires a section through the barriers.
+    Pairs are grouped by their section plane, so that each group is sliced and transformed once.
+
+    Parameters
+    ---------
+    turbine : (n,3)
+        Turbine positions.
+    receiver : (n,3)
+        Receiver positions.
+    sections
+        Cache of sections and their horizontal reach, keyed by `plane_keys`. May be shared between threads.
+
+    Returns
+    -------
+    D_Z : (n,f)
+    """
+    if sections is None:
+        sections = {}
 
-    return func(turbine, receiver, frequencies, barriers)
+    # The plane only depends on the turbine and the horizontal direction towards the receiver
+    groups: dict[bytes, list[int]] = defaultdict(list)
+    for i, key in enumerate(plane_keys(turbine, (receiver - turbine) * [1, 1, 0])):
+        groups[key].append(i)
 
+    # Determine parts per pair, then compute D_Z for all pairs and frequencies at once
+    parts = np.empty((len(turbine), 3), dtype=np.float64)
+    for key, indices in groups.items():
+        parts[indices] = _calc_group(turbine[indices], receiver[indices], key, barriers, sections)
+    z, e, K_met = parts.T
+    return calc_from_parts(z, e, K_met, frequencies)
 
-def _calc_unvectorized(
+
+class Section(NamedTuple):
+    """Flattened section of the barriers in the EV plane, shared by all pairs in that plane."""
+    polygons: list[Polygon]
+    flatten: npt.NDArray
+    # (e,2) exterior points of all polygons and (e,) polygon index of each point
+    points: npt.NDArray
+    point_ids: npt.NDArray
+    # (k,2) start and end points of all exterior edges
+    edge_starts: npt.NDArray
+    edge_ends: npt.NDArray
+    # Polygon x-extents in ascending order, and the polygon indices in that order
+    xmin_sorted: npt.NDArray
+    order_by_xmin: npt.NDArray
+    xmax_sorted: npt.NDArray
+    order_by_xmax: npt.NDArray
+
+
+def _slice(s: npt.NDArray, r: npt.NDArray, barriers: Trimesh) -> Section | None:
+    """Slices the barriers along the EV plane and transforms it, such that receiver `r` is right from turbine `s`.
+
+    Only barrier components that horizontally overlap the segment from `s` to `r` are sliced.
+    Others cannot lie between turbine and receiver, and joining them would place a barrier directly
+    below turbine or receiver.
+
+    Returns
+    -------
+    section
+        The flattened section. `None` if the section is invalid.
+    """
+    vec_sr = r - s
+    normal = np.cross(vec_sr, Z_AXIS)
+    flatten = align_plane_transform(normal=normal, point=s, align_y=Z_AXIS, direction_x=vec_sr)
+    local_faces = faces_along(s, r, barriers)
+    if local_faces.size > 0:
+        section_3d = cast(Path3D | None, barriers.section(
+            plane_normal=normal, plane_origin=s, local_faces=local_faces
+        ))
+    else:
+        section_3d = None
+    try:
+        polygons = section_to_polygons(section_3d, flatten) if section_3d is not None else []
+    except (ValueError, GEOSException) as e:
+        print("Caught error:")
+        print(e)
+        return None
+    points, point_ids = polygons_to_point_arrays(polygons)
+    # Consecutive points of the same closed ring form an edge
+    same_ring = point_ids[:-1] == point_ids[1:]
+    bounds = shapely.bounds(np.asarray(polygons, dtype=object)).reshape(-1, 4)
+    order_by_xmin = np.argsort(bounds[:, 0])
+    order_by_xmax = np.argsort(bounds[:, 2])
+    return Section(
+        polygons=polygons,
+        flatten=flatten,
+        points=points,
+        point_ids=point_ids,
+        edge_starts=points[:-1][same_ring],
+        edge_ends=points[1:][same_ring],
+        xmin_sorted=bounds[order_by_xmin, 0],
+        order_by_xmin=order_by_xmin,
+        xmax_sorted=bounds[order_by_xmax, 2],
+        order_by_xmax=order_by_xmax,
+    )
+
+
+def _calc_group(
     turbine: npt.NDArray,
     receiver: npt.NDArray,
-    frequencies: npt.NDArray,
-    barriers: Trimesh
+    key: bytes,
+    barriers: Trimesh,
+    sections: dict[bytes, tuple[float, Section | None]]
 ) -> npt.NDArray:
-    """Computes barrier attenuation over the top edge for a single turbine-receiver pair.
+    """Computes the parts of the barrier attenuation over the top edge for turbine-receiver pairs
+    that share the same EV plane.
 
 
     ASSUMPTION: There are no obstacles directly above turbine or receiver.
@@ -64,43 +160,51 @@ def _calc_unvectorized(
     
     Parameters
     ---------
-    turbine : (3)
-        Turbine position.
-    receiver : (3)
-        Receiver position.
-    frequencies : (f)
-        Octave frequencies.
+    turbine : (k,3)
+        Turbine positions.
+    receiver : (k,3)
+        Receiver positions.
+    key
+        Key of the shared plane.
     barriers
         Barriers.
+    sections
+        Cache of sections and their horizontal reach, keyed by `plane_keys`.
 
     Returns
     -------
-    D_Z : (f)
-        Barrier attenuation over top edge for the turbine-receiver pair and each octave frequency.
+    parts : (k,3)
+        Path length difference `z`, distance between first and last diffracting edge `e`
+        and meteorological factor `K_met`. All NaN if the section is invalid.
     """
-    s, r = turbine, receiver
-
-    # determine vectors
-    vec_sr = r - s
-    normal = np.cross(vec_sr, Z_AXIS)
-
-    # Slice and transform EV plane, such that receiver is right from turbine.
-    flatten = align_plane_transform(normal=normal, point=s, align_y=Z_AXIS, direction_x=vec_sr)
-    section_3d = cast(Path3D | None, barriers.section(plane_normal=normal, plane_origin=s))
-    try:
-        polygons = section_to_polygons(section_3d, flatten) if section_3d is not None else []
-    except (ValueError, GEOSException) as e:
-        print("Caught error:")
-        print(e)
-        return np.full(len(frequencies), np.nan)
-
-    s_flat, r_flat = trimesh.transform_points([s, r], flatten)[:, :2]
+    # Slice and transform EV plane, such that receivers are right from turbine.
+    # The section must reach the farthest receiver; a cached one is reused if it reaches at least as far.
+    # Only this thread's own section is used; the cache entry is only replaced by one reaching farther.
+    reach = np.hypot(*(receiver - turbine)[:, :2].T)
+    far = np.argmax(reach)
+    cached = sections.get(key)
+    if cached is not None and cached[0] >= reach[far]:
+        section = cached[1]
+    else:
+        section = _slice(turbine[0], receiver[far], barriers)
+        with _SECTIONS_LOCK:
+            cached = sections.get(key)
+            if cached is None or cached[0] < reach[far]:
+                sections[key] = reach[far], section
+    if section is None:
+        return np.full((len(turbine), 3), MISSING_PARTS)
+    # Transform all pairs of the group at once. Only the in-plane coordinates are needed.
+    flat = np.concatenate([turbine, receiver]) @ section.flatten[:2, :3].T + section.flatten[:2, 3]
+    s_flat, r_flat = flat[:len(turbine)], flat[len(turbine):]
 
-    return _calc_unvectorized_flat(s_flat, r_flat, polygons, frequencies)
+    return np.array([
+        _calc_unvectorized_flat(s, r, section)
+        for s, r in zip(s_flat, r_flat)
+    ], dtype=np.float64).reshape(-1, 3)
 
 
-def _calc_unvectorized_flat(s, r, polygons: list[Polygon], frequencies: npt.NDArray) -> npt.NDArray:
-    """Compute D_Z in the plane.
+def _calc_unvectorized_flat(s, r, section: Section) -> Parts:
+    """Compute the parts of D_Z in the plane.
 
     Parameters
     ---------
@@ -108,76 +212,114 @@ def _calc_unvectorized_flat(s, r, polygons: list[Polygon], frequencies: npt.NDAr
         Tturbine position in EV plane.
     r : (2,)
         Receiver position in EV plane.
-    polygons
-        Polygons that are fully between `s` and `r`.
-    frequencies
-        Octave frequencies.
+    section
+        Section of the barriers in the EV plane.
 
     # Case 1: Intersection is empty.
     # Case 2: Intersection is not empty, but the direct path is unblocked
     # Case 3: Intersection is not empty and the direct path is blocked
     """
-    line = LineString([s, r])
-    d = np.linalg.norm(r - s)
-
-    # Filter polygons to those fully between turbine and receiver.
+    # Filter polygons to those fully between turbine and receiver, i.e. xmin >= s.x and xmax <= r.x.
     # This is okay because there cannot be barriers above them.
-    box = shapely.box(s[0], -1e10, r[0], 1e10)
-    tree = shapely.STRtree(polygons)
-    polygons_between = list(tree.geometries[tree.query(box, 'contains')])
-
-    # Check if direct path is blocked.
-    is_blocked = tree.query(line, 'crosses').size > 0
+    between = np.zeros(len(section.polygons), dtype=np.bool_)
+    between[section.order_by_xmin[np.searchsorted(section.xmin_sorted, s[0]):]] = True
+    between[section.order_by_xmax[np.searchsorted(section.xmax_sorted, r[0], side='right'):]] = False
 
     # Determine path length difference z.
 
-    if not polygons_between:
+    if not between.any():
         # There are no barriers between turbine and receiver.
-        return calc_from_parts(
-            z=0,
-            e=0,
-            K_met=1,
-            frequencies=frequencies
-        )
-    
+        return UNBLOCKED_PARTS
+
+    # Check if direct path is blocked.
+    crosses = _crosses_any(s, r, section.edge_starts, section.edge_ends)
+    if crosses < 0:
+        # The direct line only touches edges or vertices, let GEOS decide whether it enters a polygon
+        is_blocked = bool(shapely.crosses(LineString([s, r]), np.asarray(section.polygons, dtype=object)).any())
+    else:
+        is_blocked = crosses > 0
+
+    edges = section.points[between[section.point_ids]]
+
     if not is_blocked:
         # There are barriers between turbine and receiver, but they are all below the direct line.
         # Compute negative path length difference for all polygon edges.
-        edges = polygons_to_points(polygons_between)
-        d_ss, d_sr = np.linalg.norm([edges - s, r - edges], axis=-1)
-        z_n = -np.abs((d_ss + d_sr) - d)
-        return calc_from_parts(
-            z=np.max(z_n),
-            e=0,
-            K_met=1,
-            frequencies=frequencies
-        )
+        return _unblocked_z(s, r, edges), 0, 1
 
     # There are barriers between turbine and receiver that block the direct line.
-    path = get_path(s, r, polygons_between)
+    path = get_path(s, r, edges)
+    return _blocked_parts(s, r, path)
 
-    # compute e as the path length between first and last diffracting edge
-    if len(path.coords) > 3:
-        e = LineString(path.coords[1:-1]).length
-    else:
-        e = 0
-    d_ss = LineString(path.coords[:2]).length
-    d_sr = LineString(path.coords[-2:]).length
+
+@njit(cache=True, nogil=True)
+def _crosses_any(s: npt.NDArray, r: npt.NDArray, starts: npt.NDArray, ends: npt.NDArray) -> int:
+    """Whether the segment from `s` to `r` properly crosses any of the edges from `starts` to `ends` of shape (k,2).
+
+    Returns
+    -------
+    crosses
+        1 if an edge is properly crossed, 0 if the segment does not touch any edge.
+        -1 if it only touches edges or vertices, e.g. passes through a vertex or runs along an edge.
+        Whether it then crosses a polygon cannot be decided from the edges alone.
+    """
+    dx, dy = r[0] - s[0], r[1] - s[1]
+    length_sq = dx * dx + dy * dy
+    touches = False
+    for i in range(len(starts)):
+        px, py = starts[i, 0], starts[i, 1]
+        qx, qy = ends[i, 0], ends[i, 1]
+        # Side of the line on which the edge end points lie
+        o1 = dx * (py - s[1]) - dy * (px - s[0])
+        o2 = dx * (qy - s[1]) - dy * (qx - s[0])
+        if o1 == 0:
+            t = dx * (px - s[0]) + dy * (py - s[1])
+            touches |= 0 <= t <= length_sq
+        if o2 == 0:
+            t = dx * (qx - s[0]) + dy * (qy - s[1])
+            touches |= 0 <= t <= length_sq
+        # Edge end points must lie strictly on opposite sides of the line ...
+        if not ((o1 > 0 and o2 < 0) or (o1 < 0 and o2 > 0)):
+            continue
+        # ... and turbine and receiver strictly on opposite sides of the edge
+        ex, ey = qx - px, qy - py
+        o3 = ex * (s[1] - py) - ey * (s[0] - px)
+        o4 = ex * (r[1] - py) - ey * (r[0] - px)
+        if (o3 > 0 and o4 < 0) or (o3 < 0 and o4 > 0):
+            return 1
+        # Turbine or receiver lies on the edge
+        touches |= o3 == 0 or o4 == 0
+    return -1 if touches else 0
+
+
+@njit(cache=True, nogil=True)
+def _unblocked_z(s: npt.NDArray, r: npt.NDArray, edges: npt.NDArray) -> float:
+    """Maximum negative path length difference over all polygon edges below the direct line."""
+    d = math.hypot(r[0] - s[0], r[1] - s[1])
+    z = -np.inf
+    for i in range(len(edges)):
+        d_ss = math.hypot(edges[i, 0] - s[0], edges[i, 1] - s[1])
+        d_sr = math.hypot(edges[i, 0] - r[0], edges[i, 1] - r[1])
+        z = max(z, -abs((d_ss + d_sr) - d))
+    return z
+
+
+@njit(cache=True, nogil=True)
+def _blocked_parts(s: npt.NDArray, r: npt.NDArray, path: npt.NDArray) -> tuple[float, float, float]:
+    """Parts of D_Z for a propagation path with coordinates `path` of shape (k,2) over the top of the barriers."""
+    d = math.hypot(r[0] - s[0], r[1] - s[1])
+
+    # e is the path length between first and last diffracting edge
+    d_ss, d_sr, e = path_lengths(path)
     z = (d_ss + d_sr + e) - d
 
     if z > 0:
-        K_met = np.exp(
-            -(1/2000) * np.sqrt(
+        K_met = math.exp(
+            -(1/2000) * math.sqrt(
                 (d_ss * d_sr * d)
                 / (2*z)
             )
         )
     else:
-        K_met = 1
+        K_met = 1.0
 
-    return calc_from_parts(
-        z=z,
-        e=e,
-        K_met=K_met,
-        frequencies=frequencies
-    )
+    return z, e, K_met
@@ -2,13 +2,12 @@ from collections.abc import Iterable
 from typing import Any, Literal, cast
 
 import numpy as np
-from scipy.spatial import ConvexHull
+import numpy.typing as npt
+from numba import njit
 from shapely import LineString, Polygon, STRtree
 
-from ..utils import hull_path, polygons_to_points, validate_path
 
-
-def get_path(s, r, polygons: Iterable[Polygon]) -> LineString:
+def get_path(s, r, points: npt.NDArray) -> npt.NDArray:
     """
     Constructs the vertical path for a turbine-receiver pair where the direct line is blocked.
 
@@ -18,22 +17,46 @@ def get_path(s, r, polygons: Iterable[Polygon]) -> LineString:
         Turbine.
     r
         Receiver.
-    polygons
-        Collection of polygons that lie fully between turbine and receiver.
+    points : (e,2)
+        Exterior points of the polygons that lie fully between turbine and receiver.
+
+    Returns
+    -------
+    path : (k,2)
+        Coordinates of the path, starting at `s` and ending at `r`.
 
     ASSUMPTION: r is right of s.
     """
-    line = LineString([s, r])
     vec_sr = r-s
 
     # Construct path that goes above all polygons.
     # Only add parts above the line segment.
-    points = polygons_to_points(polygons)
-    points_above = points[np.cross(vec_sr, points) > 0]
+    side = vec_sr[0] * points[:, 1] - vec_sr[1] * points[:, 0]
+    points_above = points[side > 0]
     assert len(points_above) > 0
 
-    hull = ConvexHull(np.vstack([s, r, points_above]))
-    path = hull_path(hull, line)
-    path = validate_path(path, s, r)
-    
-    return path
+    # Sort by x, then y
+    points_above = points_above[np.lexsort((points_above[:, 1], points_above[:, 0]))]
+    return _upper_hull(np.asarray(s, dtype=np.float64), np.asarray(r, dtype=np.float64), points_above)
+
+
+@njit(cache=True, nogil=True)
+def _upper_hull(s: npt.NDArray, r: npt.NDArray, points: npt.NDArray) -> npt.NDArray:
+    """Upper convex hull from `s` to `r` over `points` using Andrew's monotone chain.
+
+    `points` must lie between `s` and `r` in x and be sorted by x, then y.
+    """
+    hull = np.empty((len(points) + 2, 2))
+    hull[0] = s
+    n = 1
+    for k in range(len(points) + 1):
+        p = points[k] if k < len(points) else r
+        # Remove last point while it does not make a clockwise turn
+        while n >= 2 and (
+            (hull[n-1, 0] - hull[n-2, 0]) * (p[1] - hull[n-2, 1])
+            - (hull[n-1, 1] - hull[n-2, 1]) * (p[0] - hull[n-2, 0])
+        ) >= 0:
+            n -= 1
+        hull[n] = p
+        n += 1
+    return hull[:n].copy()
@@ -7,26 +7,37 @@ Y_AXIS = np.array([0,1,0])
 Z_AXIS = np.array([0,0,1])
 
 
+# Path length difference z, distance between first and last diffracting edge e, meteorological factor K_met
+type Parts = tuple[float, float, float]
+
+UNBLOCKED_PARTS: Parts = (0, 0, 1)
+MISSING_PARTS: Parts = (np.nan, np.nan, np.nan)
+
+
 def calc_from_parts(z, e, K_met, frequencies):
-    _lambda = 340 / frequencies
-
-    C_2 = 20
-
-    if e == 0:
-        # single diffraction
-        C_3 = 1
-    else:
-        # double diffraction
-        C_3 = (
-            (1 + (5 * _lambda / e)**2)
-            / (1/3 + (5 * _lambda / e)**2)
-        )
+    """Computes D_Z from its parts.
+
+    `z`, `e` and `K_met` are scalars or arrays of the same shape.
+    The frequency dimension is appended as last axis. NaN in `z` results in NaN.
+    Computed in single precision, the result is returned as float64.
+    """
+    # Single precision is plenty for an attenuation in dB and halves the memory traffic on large arrays
+    z, e, K_met = (np.asarray(v, dtype=np.float32)[..., np.newaxis] for v in (z, e, K_met))
+    _lambda = (340 / np.asarray(frequencies, dtype=np.float64)).astype(np.float32)
+
+    C_2 = np.float32(20)
+
+    # single diffraction if e == 0, double diffraction otherwise.
+    # Written in terms of (e / 5 lambda)^2, which yields C_3 = 1 for e == 0 without dividing by zero.
+    _ratio = (e / (5 * _lambda))**2
+    C_3 = (_ratio + 1) / (_ratio / 3 + 1)
 
-    if K_met == 0:
-        K_met = 1e-100
+    # Smallest normal float32 instead of zero. z_min may overflow to -inf, which is intended.
+    K_met = np.where(K_met == 0, np.finfo(np.float32).tiny, K_met)
 
     # determine barrier attenuation D_Z
-    z_min = (-2 * _lambda) / (C_2 * C_3 * K_met)
+    with np.errstate(over='ignore'):
+        z_min = (-2 * _lambda) / (C_2 * C_3 * K_met)
     with np.errstate(invalid='ignore'):
         D_Z = np.where(
             z > z_min,
@@ -34,4 +45,4 @@ def calc_from_parts(z, e, K_met, frequencies):
             0
         )
 
-    return D_Z
+    return np.where(np.isnan(z), np.nan, D_Z).astype(np.float64)
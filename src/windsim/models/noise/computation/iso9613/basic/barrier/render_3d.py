@@ -1,22 +1,46 @@
+import functools
 from typing import Any, Literal, cast
 
 import numpy as np
+import numpy.typing as npt
 import pyrender
 import trimesh
+from PIL import Image
 from trimesh import Trimesh
 from trimesh.path import Path2D, Path3D
+from trimesh.visual.material import SimpleMaterial
+from trimesh.visual.texture import TextureVisuals
 
 
 def path_to_mesh(path: Path2D | Path3D, radius: float = 0.5, sections: int = 4) -> Trimesh:
-    cylinders = []
-    for polyline in path.entities:
-        polyline_segments = path.vertices[polyline.nodes]  # 3d (n X 2 X 3)
-        for segment in polyline_segments:
-            assert isinstance(segment, np.ndarray)
-            if segment.shape[1] == 2:
-                segment = np.column_stack((segment, np.zeros(2)))
-            cylinders.append(trimesh.creation.cylinder(radius=radius, sections=sections, segment=segment))
-    return cast(Trimesh, trimesh.boolean.union(cylinders))
+    """Turns every line segment of the path into a cylinder, all built at once from a single unit cylinder."""
+    vertices = path.vertices
+    if vertices.shape[1] == 2:
+        vertices = np.column_stack((vertices, np.zeros(len(vertices))))
+    if len(path.entities) == 0:
+        return Trimesh()
+    segments = vertices[np.concatenate([polyline.nodes for polyline in path.entities])]  # (n,2,3)
+
+    start = segments[:, 0]
+    axis = segments[:, 1] - start
+    length = np.linalg.norm(axis, axis=1)
+    start, axis, length = start[length > 0], axis[length > 0], length[length > 0]
+
+    # Orthonormal basis around each segment. The helper vector only must not be parallel to the segment.
+    z = axis / length[:, np.newaxis]
+    helper = np.where(np.abs(z[:, [0]]) < 0.9, [1.0, 0.0, 0.0], [0.0, 1.0, 0.0])
+    x = np.cross(z, helper)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    y = np.cross(z, x)
+
+    # Unit cylinder from z=0 to z=1, scaled to the segment length by using the unnormalized axis
+    unit = trimesh.creation.cylinder(radius=radius, sections=sections, height=1)
+    unit_vertices = unit.vertices + [0, 0, 0.5]
+    basis = np.stack([x, y, axis], axis=-1)  # (n,3,3)
+    cylinder_vertices = np.einsum('nij,vj->nvi', basis, unit_vertices) + start[:, np.newaxis]
+    cylinder_faces = unit.faces[np.newaxis] + (np.arange(len(start)) * len(unit_vertices))[:, np.newaxis, np.newaxis]
+
+    return Trimesh(vertices=cylinder_vertices.reshape(-1, 3), faces=cylinder_faces.reshape(-1, 3))
 
 def point_to_mesh(point, radius=1.0, color=None) -> Trimesh:
     mesh = trimesh.creation.icosphere(radius=radius).apply_translation(point)
@@ -25,6 +49,25 @@ def point_to_mesh(point, radius=1.0, color=None) -> Trimesh:
     return mesh
 
 
+@functools.lru_cache(maxsize=4)
+def create_grid_image(width, height, grid_size, line_width=1, line_color=(0, 0, 0), bg_color=(255, 255, 255)):
+    """Generates a grid image using NumPy. Cached, so colors must be passed as tuples."""
+    # Create a background image
+    image_array = np.full((height, width, 3), bg_color, dtype=np.uint8)
+    
+    # Draw vertical grid lines
+    columns = (np.arange(0, width, grid_size)[:, np.newaxis] + np.arange(line_width)).ravel()
+    image_array[:, columns[columns < width]] = line_color
+    
+    # Draw horizontal grid lines
+    rows = (np.arange(0, height, grid_size)[:, np.newaxis] + np.arange(line_width)).ravel()
+    image_array[rows[rows < height], :] = line_color
+    
+    # Convert the NumPy array to a PIL Image
+    image = Image.fromarray(image_array, 'RGB')
+    return image
+
+
 def render_3d(barriers: Trimesh, s = None, r = None, *, top_path: Path3D | None = None, left_path: Path3D | None = None, right_path: Path3D | None = None, renderer: Literal['trimesh', 'pyrender'], lines_to_mesh: bool = True):
     # remesh
     # barriers = barriers.subdivide().subdivide()
@@ -104,30 +147,10 @@ def render_3d(barriers: Trimesh, s = None, r = None, *, top_path: Path3D | None
     ground_plane = trimesh.creation.box([2000, 2000, PLANE_HEIGHT], trimesh.transformations.translation_matrix([0,0,-PLANE_HEIGHT/2]))
     # ground_plane.visual.vertex_colors = [255,255,255]
 
-    from PIL import Image, ImageDraw
-    from trimesh.visual.material import SimpleMaterial
-    from trimesh.visual.texture import TextureVisuals
-
     # Step 1: Create a plane mesh with small thickness
     plane_mesh = ground_plane
 
-    # Step 2: Generate a high-resolution grid image using NumPy
-    def create_grid_image(width, height, grid_size, line_width=1, line_color=(0, 0, 0), bg_color=(255, 255, 255)):
-        # Create a background image
-        image_array = np.full((height, width, 3), bg_color, dtype=np.uint8)
-        
-        # Draw vertical grid lines
-        for x in range(0, width, grid_size):
-            image_array[:, x:x+line_width] = line_color
-        
-        # Draw horizontal grid lines
-        for y in range(0, height, grid_size):
-            image_array[y:y+line_width, :] = line_color
-        
-        # Convert the NumPy array to a PIL Image
-        image = Image.fromarray(image_array, 'RGB')
-        return image
-
+    # Step 2: Generate a high-resolution grid image
     # Increase the resolution for sharper lines
     grid_image = create_grid_image(
         width=5_000,  # Higher resolution width
@@ -141,14 +164,12 @@ def render_3d(barriers: Trimesh, s = None, r = None, *, top_path: Path3D | None
 
     # Step 3: Compute UV coordinates for the mesh vertices
     # Extract the vertex positions
-    vertices = plane_mesh.vertices
-    x = vertices[:, 0]
-    y = vertices[:, 1]
+    xy = plane_mesh.vertices[:, :2]
 
-    # Normalize x and y to range [0, 1] for UV mapping
-    u = (x - x.min()) / (x.max() - x.min())
-    v = (y - y.min()) / (y.max() - y.min())
-    uv = np.column_stack((u, v))
+    # Normalize x and y to range [0, 1] for UV mapping, writing into a single output array
+    uv = np.empty((len(xy), 2))
+    np.subtract(xy, xy.min(axis=0), out=uv)
+    uv /= np.ptp(xy, axis=0)
 
     material = SimpleMaterial(image=grid_image)
     plane_mesh.visual = TextureVisuals(uv=uv, material=material)
@@ -183,8 +204,6 @@ def render_3d(barriers: Trimesh, s = None, r = None, *, top_path: Path3D | None
 
         scene.show(window_conf=config, smooth=False, resolution=(1920, 1080))
     elif renderer == "pyrender":
-        import pyrender  # type: ignore
-
         # Assuming you have a trimesh scene `scene`
         pyrender_scene = from_trimesh_scene(scene)#, ambient_light=[0.02, 0.02, 0.02])
 
@@ -292,7 +311,6 @@ def render_3d(barriers: Trimesh, s = None, r = None, *, top_path: Path3D | None
         color, depth = r.render(pyrender_scene, flags=render_flags)
 
         # Optionally downscale the image if needed
-        from PIL import Image
         image = Image.fromarray(color)
         # image = image.resize((1024, 768), Image.ANTIALIAS)
         image.show()
@@ -320,8 +338,6 @@ def from_trimesh_scene(trimesh_scene,
         scene_pr : :class:`Scene`
             A scene containing the same geometry as the trimesh scene.
         """
-        import pyrender
-
         material = pyrender.MetallicRoughnessMaterial(
             # baseColorFactor=[1.0, 0.5, 0.5, 1.0],  # Red color
             metallicFactor=0.0,  # Non-metallic
@@ -344,10 +360,12 @@ def from_trimesh_scene(trimesh_scene,
 
 
 
-def add_raymond_lights(scene: pyrender.Scene, intensity=1.0, parent: pyrender.Node | None = None):
+def _raymond_light_poses() -> npt.NDArray:
+    """Poses of the three directional Raymond lights, of shape (3,4,4)."""
     thetas = np.pi * np.array([1.0 / 6.0, 1.0 / 6.0, 1.0 / 6.0])
     phis = np.pi * np.array([0.0, 2.0 / 3.0, 4.0 / 3.0])
 
+    poses = []
     for phi, theta in zip(phis, thetas):
         xp = np.sin(theta) * np.cos(phi)
         yp = np.sin(theta) * np.sin(phi)
@@ -363,9 +381,17 @@ def add_raymond_lights(scene: pyrender.Scene, intensity=1.0, parent: pyrender.No
 
         matrix = np.eye(4)
         matrix[:3,:3] = np.c_[x,y,z]
+        poses.append(matrix)
+    return np.stack(poses)
 
+# The light arrangement is fixed, so it is computed once
+_RAYMOND_POSES = _raymond_light_poses()
+
+
+def add_raymond_lights(scene: pyrender.Scene, intensity=1.0, parent: pyrender.Node | None = None):
+    for matrix in _RAYMOND_POSES:
         scene.add(
             pyrender.DirectionalLight(color=np.ones(3), intensity=intensity),
             pose=matrix,
             parent_node=parent if parent is not None else next(iter(scene.camera_nodes))
-        )
\ No newline at end of file
+        )
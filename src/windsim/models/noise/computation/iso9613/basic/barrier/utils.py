@@ -1,13 +1,17 @@
 import logging
+import math
+from collections.abc import Sequence
 from typing import Any, Literal, Type, cast, overload
+from weakref import WeakKeyDictionary
 
 import numpy as np
 import numpy.typing as npt
 import shapely.ops
 import trimesh
+from numba import njit
 from scipy.spatial import ConvexHull
 from shapely import (LinearRing, LineString, MultiLineString, MultiPolygon,
-                     Polygon)
+                     Polygon, STRtree)
 from shapely.errors import GEOSException
 from trimesh import Trimesh
 from trimesh.path import Path2D, Path3D
@@ -27,8 +31,103 @@ def hull_path(hull: ConvexHull, segment: LineString) -> LineString:
         assert isinstance(path, LineString)
     return path
 
+# Index trees over the horizontal extent of barrier faces, see `footprint_tree`
+_FOOTPRINT_TREES: WeakKeyDictionary[Trimesh, STRtree] = WeakKeyDictionary()
+
+def footprint_tree(barriers: Trimesh) -> STRtree:
+    """Returns an index tree over the horizontal bounding boxes of all barrier faces.
+    The tree is built once per barriers object."""
+    tree = _FOOTPRINT_TREES.get(barriers)
+    if tree is None:
+        triangles_xy = barriers.triangles[:, :, :2]
+        lower, upper = triangles_xy.min(axis=1), triangles_xy.max(axis=1)
+        tree = STRtree(shapely.box(lower[:, 0], lower[:, 1], upper[:, 0], upper[:, 1]))
+        _FOOTPRINT_TREES[barriers] = tree
+    return tree
+
+# Index trees over the horizontal extent of connected barrier components, see `component_tree`
+_COMPONENT_TREES: WeakKeyDictionary[Trimesh, tuple[STRtree, list[npt.NDArray]]] = WeakKeyDictionary()
+
+def component_tree(barriers: Trimesh) -> tuple[STRtree, list[npt.NDArray]]:
+    """Returns an index tree over the horizontal bounding boxes of all connected barrier components,
+    together with the face indices of each component.
+    The tree is built once per barriers object."""
+    cached = _COMPONENT_TREES.get(barriers)
+    if cached is None:
+        labels = trimesh.graph.connected_component_labels(barriers.face_adjacency, node_count=len(barriers.faces))
+        order = np.argsort(labels, kind='stable')
+        starts = np.flatnonzero(np.diff(labels[order], prepend=-1))
+        triangles_xy = barriers.triangles[order, :, :2]
+        lower = np.minimum.reduceat(triangles_xy.min(axis=1), starts)
+        upper = np.maximum.reduceat(triangles_xy.max(axis=1), starts)
+        tree = STRtree(shapely.box(lower[:, 0], lower[:, 1], upper[:, 0], upper[:, 1]))
+        cached = tree, np.split(order, starts[1:])
+        _COMPONENT_TREES[barriers] = cached
+    return cached
+
+def faces_along(s: npt.NDArray, r: npt.NDArray, barriers: Trimesh) -> npt.NDArray:
+    """Returns the indices of all faces of barrier components whose horizontal bounding box
+    intersects the horizontal segment from `s` to `r`."""
+    tree, component_faces = component_tree(barriers)
+    indices = tree.query(shapely.linestrings([s[:2], r[:2]]), predicate='intersects')
+    if indices.size == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate([component_faces[i] for i in indices])
+
+def is_obstructed(s: npt.NDArray, r: npt.NDArray, barriers: Trimesh) -> npt.NDArray:
+    """Determines for each turbine-receiver pair whether barriers may lie above or below the direct line.
+
+    Pairs where this is `False` have no barriers in the vertical plane between turbine and receiver.
+    The test is conservative, i.e. it may be `True` for pairs without such barriers.
+
+    Parameters
+    ----------
+    s : (n,3)
+        Turbine positions.
+    r : (n,3)
+        Receiver positions.
+
+    Returns
+    -------
+    is_obstructed : (n,)
+    """
+    lines = shapely.linestrings(np.stack([s[:, :2], r[:, :2]], axis=1))
+    line_indices, _ = footprint_tree(barriers).query(lines, predicate='intersects')
+    obstructed = np.zeros(len(lines), dtype=np.bool_)
+    obstructed[line_indices] = True
+    return obstructed
+
+def plane_keys(points: npt.NDArray, directions: npt.NDArray, decimals: int = 6) -> list[bytes]:
+    """Returns a hashable key for each section plane through `points` of shape (n,3)
+    that is oriented by `directions` of shape (n,3).
+    Rounding ensures that pairs with numerically identical planes share a key."""
+    directions = directions / np.linalg.norm(directions, axis=-1, keepdims=True)
+    # Adding zero turns negative zeros into positive ones
+    rounded = np.round(np.concatenate([points, directions], axis=-1), decimals) + 0.0
+    return [row.tobytes() for row in rounded]
+
+@njit(cache=True, nogil=True)
+def path_lengths(coords: npt.NDArray) -> tuple[float, float, float]:
+    """Returns the length of the first segment `d_ss`, of the last segment `d_sr`
+    and of all segments in between `e` of a propagation path with coordinates `coords` of shape (k,2)."""
+    n = len(coords)
+    d_ss = math.hypot(coords[1, 0] - coords[0, 0], coords[1, 1] - coords[0, 1])
+    d_sr = math.hypot(coords[n-1, 0] - coords[n-2, 0], coords[n-1, 1] - coords[n-2, 1])
+    e = 0.0
+    for i in range(1, n - 2):
+        e += math.hypot(coords[i+1, 0] - coords[i, 0], coords[i+1, 1] - coords[i, 1])
+    return d_ss, d_sr, e
+
 def polygons_to_points(polygons) -> npt.NDArray:
-    return np.vstack([p.exterior.coords for p in polygons])
+    """Returns the exterior coordinates of all polygons as a single array of shape (e,2)."""
+    return shapely.get_coordinates(shapely.get_exterior_ring(np.asarray(polygons, dtype=object)))
+
+def polygons_to_point_arrays(polygons) -> tuple[npt.NDArray, npt.NDArray]:
+    """Returns the exterior coordinates of all polygons as a single contiguous array of shape (e,2),
+    together with the index of the polygon that each point belongs to, of shape (e,)."""
+    rings = shapely.get_exterior_ring(np.asarray(polygons, dtype=object))
+    points, point_ids = shapely.get_coordinates(rings, return_index=True)
+    return np.ascontiguousarray(points), point_ids
 
 # def split(polygons, line: LineString) -> list[Polygon]:
 #     _splits = [shapely.ops.split(p, line) for p in polygons]
@@ -49,10 +148,15 @@ def validate_path(path: LineString, s, r) -> LineString:
     s, r = np.asarray(s), np.asarray(r)
     coords = np.asarray(path.coords)
 
-    if np.allclose(coords[0], s) and np.allclose(coords[-1], r):
+    # Squared distances between path ends and s/r, compared against the tolerances of `np.allclose`
+    tol2_s = (1e-8 + 1e-5 * math.hypot(*s))**2
+    tol2_r = (1e-8 + 1e-5 * math.hypot(*r))**2
+    start, end = coords[0], coords[-1]
+
+    if math.dist(start, s)**2 <= tol2_s and math.dist(end, r)**2 <= tol2_r:
         # Path is correctly oriented
         pass
-    elif np.allclose(coords[0], r) and np.allclose(coords[-1], s):
+    elif math.dist(start, r)**2 <= tol2_r and math.dist(end, s)**2 <= tol2_s:
         # Path is reversed; reverse it to match s and r
         coords = coords[::-1]
     else:
@@ -65,10 +169,36 @@ def validate_path(path: LineString, s, r) -> LineString:
 
 
 def section_to_polygons(section_3d: Path3D, flatten: npt.NDArray):
-    vertices_flat = trimesh.transform_points(section_3d.vertices, flatten)
+    # Only the in-plane coordinates are needed
+    vertices_flat = section_3d.vertices @ flatten[:2, :3].T + flatten[:2, 3]
+    return _flat_section_to_polygons(section_3d, vertices_flat)
+
+
+def section_to_polygons_batch(sections_3d: Sequence[Path3D | None], flattens: npt.NDArray) -> list[list[Polygon]]:
+    """Like `section_to_polygons` for many sections, each with its own transformation matrix in `flattens`.
+    The vertices of all sections are transformed at once. Missing sections have no polygons."""
+    present = [i for i, section_3d in enumerate(sections_3d) if section_3d is not None]
+    polygons: list[list[Polygon]] = [[] for _ in sections_3d]
+    if not present:
+        return polygons
+
+    vertices = [cast(Path3D, sections_3d[i]).vertices for i in present]
+    lengths = [len(v) for v in vertices]
+    owner = np.repeat(present, lengths)
+    flattens = np.asarray(flattens)
+    vertices_flat = (
+        np.einsum('nij,nj->ni', flattens[owner, :2, :3], np.concatenate(vertices))
+        + flattens[owner, :2, 3]
+    )
+    for i, v in zip(present, np.split(vertices_flat, np.cumsum(lengths)[:-1])):
+        polygons[i] = _flat_section_to_polygons(cast(Path3D, sections_3d[i]), v)
+    return polygons
+
+
+def _flat_section_to_polygons(section_3d: Path3D, vertices_flat: npt.NDArray) -> list[Polygon]:
     section_2d = Path2D(
         entities=section_3d.entities,
-        vertices=vertices_flat[:, :2],
+        vertices=vertices_flat,
         metadata=section_3d.metadata,
         process=False
     )
@@ -123,8 +253,3 @@ def slice_barriers(normal, origin, barriers: Trimesh, flatten: npt.NDArray) -> l
     polygons = cast(list[shapely.Polygon], section_2d.polygons_full)
     
     return polygons
-
-
-
-
-PATHS = dict(top=[], left=[], right=[], flatten_top=[], flatten_lat=[])
@@ -3,41 +3,44 @@ from __future__ import annotations
 import numpy as np
 import xarray as xr
 
+# Converts levels in dB to natural exponents, 10^(L/10) = exp(L * _DB_TO_EXP)
+_DB_TO_EXP = np.log(10) / 10
+
+
+def level_sum(levels: xr.DataArray, dim: str, weights: xr.DataArray | None = None) -> xr.DataArray:
+    """Energetic sum `10 log10(sum(weights * 10^(levels/10)))` of levels in dB over `dim`.
+
+    Computed as a log-sum-exp: levels are shifted by their maximum along `dim` before exponentiating,
+    so large levels cannot overflow. Both the maximum and the sum are regular chunked reductions,
+    so chunks along `dim` are never merged. NaN levels do not contribute, just like with `sum`.
+    """
+    shift = levels.max(dim)
+    # Without any finite level, there is nothing to shift by
+    shift = shift.where(np.isfinite(shift), 0)
+    powers = np.exp((levels - shift) * _DB_TO_EXP)
+    if weights is not None:
+        powers = weights * powers
+    return shift + np.log(powers.sum(dim)) / _DB_TO_EXP
+
 
 def L_Aeq_k_j(ds: xr.Dataset, sound_power_levels: xr.DataArray, a_weighting: xr.DataArray) -> xr.Dataset:
     """Just like L_AT_DW, except that turbines are not summed up yet"""
-    ds = ds.copy()
-    ds['L_Aeq_k_j'] = (
-        10 * np.log10(
-            (10 ** (0.1 * (
-                sound_power_levels - ds['A_total'] + a_weighting
-            )))
-            .sum(dim='frequency')
-        )
-    )
-    return ds
+    return ds.assign(L_Aeq_k_j=level_sum(sound_power_levels - ds['A_total'] + a_weighting, dim='frequency'))
 
 
 def L_Aeq_j(ds: xr.Dataset, exposure_times: xr.DataArray, timeslice_durations: xr.DataArray) -> xr.Dataset:
-    ds = ds.copy()
-    ds['L_Aeq_j'] = (
-        10 * np.log10(
-            (exposure_times * 10 ** (0.1 * ds['L_Aeq_k_j']))
-            .sum(dim='turbine')
-            / timeslice_durations
-        )
-    )
-    return ds
+    return ds.assign(L_Aeq_j=(
+        level_sum(ds['L_Aeq_k_j'], dim='turbine', weights=exposure_times)
+        - 10 * np.log10(timeslice_durations)
+    ))
 
 
 def L_r(ds: xr.Dataset, timeslice_durations: xr.DataArray) -> xr.Dataset:
-    ds = ds.copy()
-    ds['T_r'] = timeslice_durations.sum()
-    ds['L_r'] = (
-        10 * np.log10(
-            (timeslice_durations * 10 ** (0.1 * ds['L_Aeq_j']))
-            .sum(dim='timeslice')
-            / ds['T_r']
+    T_r = timeslice_durations.sum()
+    return ds.assign(
+        T_r=T_r,
+        L_r=(
+            level_sum(ds['L_Aeq_j'], dim='timeslice', weights=timeslice_durations)
+            - 10 * np.log10(T_r)
         )
     )
-    return ds
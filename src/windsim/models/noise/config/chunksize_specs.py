@@ -4,21 +4,21 @@ from dataclasses import dataclass
 
 
 class ChunksizeSpecification:
-    pass
+    __slots__ = ()
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Custom(ChunksizeSpecification):
     value: int
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Auto(ChunksizeSpecification):
     pass
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CappedAuto(ChunksizeSpecification):
     max: int
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Disabled(ChunksizeSpecification):
     pass
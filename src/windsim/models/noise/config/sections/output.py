@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import Any
 
 import numpy as np
+import numpy.typing as npt
 
 from ..exceptions import ConfigError
 from ._abstract import Section
@@ -24,7 +25,7 @@ class OutputMapSection(Section):
     contour_line_visibility: float
     contour_fill_visibility: float
     tiles: MapTilesConfig
-    contour_levels: float | list[float]
+    contour_levels: float | list[float] | npt.NDArray
     add_contour_labels: bool
     add_receiver_labels: bool
     individual_colors: bool
@@ -43,7 +44,13 @@ class OutputMapSection(Section):
 
         r = raw['contour_levels']
         if isinstance(r, dict):
-            self.contour_levels = list(np.arange(r['start'], r['stop'] + r['step']/2, r['step']))
+            if not r['step'] > 0:
+                raise ConfigError('Contour level step must be positive')
+            if not r['stop'] >= r['start']:
+                raise ConfigError('Contour level stop must not be less than start')
+            # Count the levels explicitly, as float steps in `np.arange` may add or drop the last level
+            num = int(round((r['stop'] - r['start']) / r['step'])) + 1
+            self.contour_levels = np.linspace(r['start'], r['stop'], num)
         else:
             self.contour_levels = r
 
@@ -58,9 +65,10 @@ class OutputFileSection(Section):
         super().__init__(raw)
 
         self.folder = Path(raw['folder']).resolve()
-        self.folder.mkdir(exist_ok=True)
-        if not self.folder.exists():
-                raise ConfigError(f"Output folder '{self.folder}' does not exist")
+        try:
+            self.folder.mkdir(exist_ok=True)
+        except OSError as e:
+            raise ConfigError(f"Output folder '{self.folder}' could not be created") from e
 
 
 class OutputSection(Section):
@@ -1,16 +1,20 @@
 from __future__ import annotations
 
+import hashlib
 import logging
+import sys
 from collections.abc import Collection, Sequence
 from typing import Any, Literal, TypedDict, cast, overload
 
 import geopandas as gpd
 import numpy as np
+import numpy.typing as npt
 import pyproj
 import shapely
 import trimesh
 import xarray as xr
-from shapely import GeometryCollection, MultiPolygon, Polygon
+from manifold3d import Manifold, Mesh64, OpType
+from shapely import GeometryCollection, GeometryType, MultiPolygon, Polygon
 from shapely.geometry import shape
 from trimesh import Trimesh
 
@@ -29,6 +33,18 @@ def xr_as_dtype(ds: xr.Dataset, dtypes: dict) -> xr.Dataset:
             raise ValueError(f"Unexpected attribute '{name}'")
         dtype, placeholder = _parse_dtype(dtypes[name])
 
+        # Numeric data in memory: detect, fill and convert in a single pass over the values
+        if isinstance(var.data, np.ndarray) and var.dtype.kind in "biuf" and dtype != "str_interned":
+            values = var.data
+            if values.dtype.kind == "f":
+                missing = np.isnan(values)
+                if missing.any():
+                    if placeholder is None:
+                        raise ValueError(f"{name} missing for some models")
+                    values = np.where(missing, placeholder, values)
+            ds[name] = var.copy(data=values.astype(dtype, copy=False))
+            continue
+
         # Fill placeholder
         if placeholder is None:
             if var.isnull().any():
@@ -37,7 +53,10 @@ def xr_as_dtype(ds: xr.Dataset, dtypes: dict) -> xr.Dataset:
             var = var.fillna(placeholder)
 
         # Convert type
-        ds[name] = var.astype(dtype, copy=False)
+        if dtype == "str_interned":
+            ds[name] = var.copy(data=_intern_strings(var.values))
+        else:
+            ds[name] = var.astype(dtype, copy=False)
 
     # Create missing variables
     for name in set(dtypes) - set(ds.variables):
@@ -51,6 +70,11 @@ def xr_as_dtype(ds: xr.Dataset, dtypes: dict) -> xr.Dataset:
     return ds
 
 
+def _intern_strings(values: npt.NDArray) -> npt.NDArray:
+    """Converts to an object array of strings in which equal strings share a single object."""
+    return np.vectorize(sys.intern, otypes=[object])(np.asarray(values).astype(str))
+
+
 def _parse_dtype(a) -> tuple[Any, Any]:
     if not isinstance(a, tuple | list):
         a = (a, None)
@@ -75,6 +99,29 @@ def _parse_dtype(a) -> tuple[Any, Any]:
 #     return xr.Dataset.from_dataframe(df)
 
 
+# Recent results of `layout` and `barriers_3d`, keyed by `_digest` of their geometric input.
+# The caches live as long as the process, so up to `_CACHE_SIZE` full barrier meshes stay in memory.
+_CACHE_SIZE = 4
+_LAYOUT_CACHE: dict[bytes, tuple[MultiPolygon, list[float]]] = {}
+_BARRIERS_CACHE: dict[bytes, Trimesh] = {}
+
+
+def _digest(geometries, heights) -> bytes:
+    """Content hash of geometries and their heights."""
+    h = hashlib.blake2b(digest_size=16)
+    for wkb in shapely.to_wkb(np.asarray(geometries, dtype=object)):
+        h.update(wkb)
+    h.update(np.asarray(heights, dtype=np.float64).tobytes())
+    return h.digest()
+
+
+def _store(cache: dict, key: bytes, value) -> None:
+    """Inserts into the cache and evicts the oldest entries beyond `_CACHE_SIZE`."""
+    cache[key] = value
+    while len(cache) > _CACHE_SIZE:
+        del cache[next(iter(cache))]
+
+
 def layout(environment: xr.Dataset, *, config: ConfigData) -> tuple[MultiPolygon, list[float]]:
     buildings = environment.sel(index=environment['object_class'] == 'residential_building')
 
@@ -85,7 +132,7 @@ def layout(environment: xr.Dataset, *, config: ConfigData) -> tuple[MultiPolygon
             buildings = buildings.sel(index=buildings['postcode'] == barrier_filter.postcode)
 
     polygons_raw = buildings['geometry'].to_numpy()
-    heights_raw = buildings['building_height_m'].to_numpy()
+    heights_raw = np.asarray(buildings['building_height_m'], dtype=np.float64)
 
     # DEBUG: adjust heights by random offset
     _jitter = config.debug.jitter_building_heights
@@ -93,38 +140,57 @@ def layout(environment: xr.Dataset, *, config: ConfigData) -> tuple[MultiPolygon
         mean, max_dev = _jitter.average_offset, _jitter.max_offset_deviation
         z_score = 2  # 95.4 % interval
         std_dev = max_dev / z_score
-        rand_offset = (
-            config.rng.normal(mean, std_dev, size=len(heights_raw))
-            .clip(mean - max_dev, mean + max_dev)
-        )
+        # draw, scale and clip the offsets within a single buffer
+        rand_offset = np.empty_like(heights_raw)
+        config.rng.standard_normal(out=rand_offset)
+        rand_offset *= std_dev
+        rand_offset += mean
+        np.clip(rand_offset, mean - max_dev, mean + max_dev, out=rand_offset)
         heights_raw += rand_offset
 
-    # validate polygons
-    polygons: list[Polygon] = []
-    heights: list[float] = []
-    for p, h in zip(polygons_raw, heights_raw):
-        # ensure the polygons are valid
-        p = shapely.make_valid(p)
-        if isinstance(p, Polygon):
-            polygons.append(p)
-            heights.append(h)
-        elif isinstance(p, MultiPolygon):
-            ps = p.geoms
-            polygons += ps
-            heights += [h] * len(ps)
-        elif isinstance(p, GeometryCollection):
-            ps = [x for x in p.geoms if isinstance(x, Polygon)]
-            polygons += ps
-            heights += [h] * len(ps)
-        else:
-            raise ValueError(f"Polygon has invalid type after validation: {type(p)}")
+    # The remaining steps only depend on the footprints and the final heights
+    key = _digest(polygons_raw, heights_raw)
+    cached = _LAYOUT_CACHE.get(key)
+    if cached is None:
+        cached = _validated_layout(polygons_raw, heights_raw)
+        _store(_LAYOUT_CACHE, key, cached)
+    polygons, heights = cached
+    return polygons, list(heights)
+
+
+def _validated_layout(polygons_raw: npt.NDArray, heights_raw: npt.NDArray) -> tuple[MultiPolygon, list[float]]:
+    # ensure the polygons are valid; only invalid ones need to be fixed
+    valid = np.array(polygons_raw, dtype=object)
+    _needs_fix = ~shapely.is_valid(valid)
+    valid[_needs_fix] = shapely.make_valid(valid[_needs_fix])
+    type_ids = shapely.get_type_id(valid)
+    _allowed = [GeometryType.POLYGON, GeometryType.MULTIPOLYGON, GeometryType.GEOMETRYCOLLECTION]
+    _invalid = ~np.isin(type_ids, _allowed)
+    if _invalid.any():
+        raise ValueError(f"Polygon has invalid type after validation: {GeometryType(type_ids[_invalid][0]).name}")
+
+    # Split multi-part geometries and keep their polygons, each with the height of its building
+    parts, part_index = shapely.get_parts(valid, return_index=True)
+    is_polygon = shapely.get_type_id(parts) == GeometryType.POLYGON
+    polygons = parts[is_polygon]
+    heights = cast(list[float], heights_raw[part_index[is_polygon]].tolist())
     assert len(polygons) == len(heights)
-    assert all(isinstance(p, Polygon) for p in polygons)
 
-    return MultiPolygon(polygons), heights
+    return cast(MultiPolygon, shapely.multipolygons(polygons)), heights
 
 
 def barriers_3d(polygons: MultiPolygon, heights: list[float]) -> trimesh.Trimesh:
+    # Reruns with the same buildings reuse the mesh.
+    # Callers get a copy, since meshes are modified in place, e.g. translated.
+    key = _digest(polygons.geoms, heights)
+    mesh = _BARRIERS_CACHE.get(key)
+    if mesh is None:
+        mesh = _barriers_3d(polygons, heights)
+        _store(_BARRIERS_CACHE, key, mesh)
+    return mesh.copy()
+
+
+def _barriers_3d(polygons: MultiPolygon, heights: list[float]) -> trimesh.Trimesh:
     # convert 2D polygons to 3D meshes
     meshes: list[trimesh.Trimesh] = []
     for p, h in zip(polygons.geoms, heights):
@@ -133,15 +199,59 @@ def barriers_3d(polygons: MultiPolygon, heights: list[float]) -> trimesh.Trimesh
             trimesh.creation.extrude_polygon(p, h, engine="triangle")
         )
     
-    # Move everything towards the origin.
+    # Only barriers that intersect or touch each other need a boolean union.
+    # All others can simply be combined.
+    combined: list[Trimesh] = []
+    for group in _touching_groups(polygons.geoms):
+        if len(group) == 1:
+            combined.append(meshes[group[0]])
+        else:
+            combined.append(_union([meshes[i] for i in group]))
+
+    return _concatenate(combined)
+
+
+def _concatenate(meshes: list[Trimesh]) -> Trimesh:
+    """Combines the meshes into one by stacking their vertices and offsetting their faces."""
+    vertices = [m.vertices for m in meshes]
+    offsets = np.cumsum([0] + [len(v) for v in vertices[:-1]])
+    faces = [m.faces + offset for m, offset in zip(meshes, offsets)]
+    return Trimesh(
+        vertices=np.concatenate(vertices) if meshes else np.empty((0, 3)),
+        faces=np.concatenate(faces) if meshes else np.empty((0, 3), dtype=np.int64),
+        process=False
+    )
+
+
+def _union(meshes: list[Trimesh]) -> Trimesh:
+    # Move everything towards the origin, i.e. the center of the common bounding box.
     # This seems to be necessary for boolean union to work correctly.
-    concatenation = cast(Trimesh, trimesh.util.concatenate(meshes))
-    translation = -concatenation.center_mass
+    lower = np.min([m.vertices.min(axis=0) for m in meshes], axis=0)
+    upper = np.max([m.vertices.max(axis=0) for m in meshes], axis=0)
+    translation = -(lower + upper) / 2
     for mesh in meshes:
-        mesh.apply_translation(translation)
+        mesh.vertices += translation
     
-    # combine meshes and move back to original coords
-    mesh = cast(Trimesh, trimesh.boolean.union(cast(Any, meshes)))
-    mesh.apply_translation(-translation)
+    # combine meshes in a single variadic boolean operation and move back to original coords
+    # in double precision, so that projected coordinates keep their resolution
+    manifolds = [
+        Manifold(mesh=Mesh64(
+            vert_properties=np.asarray(m.vertices, dtype=np.float64),
+            tri_verts=np.asarray(m.faces, dtype=np.uint64),
+        ))
+        for m in meshes
+    ]
+    result = Manifold.batch_boolean(manifolds, OpType.Add).to_mesh64()
+    mesh = Trimesh(vertices=result.vert_properties, faces=result.tri_verts, process=False)
+    mesh.vertices -= translation
 
     return mesh
+
+
+def _touching_groups(polygons: Sequence[Polygon]) -> list[npt.NDArray]:
+    """Groups the polygon indices by connected clusters of polygons that intersect or touch."""
+    polygons = np.asarray(polygons, dtype=object)
+    pairs = shapely.STRtree(polygons).query(polygons, predicate='intersects')
+    labels = trimesh.graph.connected_component_labels(pairs.T, node_count=len(polygons))
+    order = np.argsort(labels, kind='stable')
+    return np.split(order, np.flatnonzero(np.diff(labels[order])) + 1)
@@ -1,8 +1,11 @@
 import pyproj.aoi
+import functools
 import logging
 from typing import override
 from dataclasses import dataclass
 
+import numpy as np
+
 from planner import Asset, Recipe, inject, DataAsset
 
 from windsim.coordinate_reference_systems import CRS
@@ -31,14 +34,16 @@ class AreaOfInterestRecipe(Recipe[AreaOfInterestAsset]):
         specs = self.config.data.input.area
         match specs:
             case area_specs.Corners():
-                t = pyproj.Transformer.from_crs(specs.crs, CRS.WGS84, always_xy=True)
-                bl_wgs, tr_wgs = t.transform(*specs.botleft), t.transform(*specs.topright)
+                # transform both corners in a single call
+                (xmin, xmax), (ymin, ymax) = _to_wgs84(specs.crs).transform(
+                    np.array([specs.botleft[0], specs.topright[0]]),
+                    np.array([specs.botleft[1], specs.topright[1]])
+                )
                 return AreaOfInterestAsset(
-                    data=pyproj.aoi.AreaOfInterest(bl_wgs[0], bl_wgs[1], tr_wgs[0],tr_wgs[1])
+                    data=pyproj.aoi.AreaOfInterest(xmin, ymin, xmax, ymax)
                 )
             case area_specs.CenterExtent():
-                t = pyproj.Transformer.from_crs(specs.crs, CRS.WGS84, always_xy=True)
-                center_wgs = t.transform(*specs.center)
+                center_wgs = _to_wgs84(specs.crs).transform(*specs.center)
                 size = 0.000005  # dummy size
                 return AreaOfInterestAsset(
                     data=pyproj.aoi.AreaOfInterest(center_wgs[0]-size, center_wgs[1]-size, center_wgs[0]+size, center_wgs[1]+size)
@@ -51,3 +56,8 @@ class AreaOfInterestRecipe(Recipe[AreaOfInterestAsset]):
                 )
             case _:
                 assert False
+
+
+@functools.lru_cache(maxsize=64)
+def _to_wgs84(crs: pyproj.CRS) -> pyproj.Transformer:
+    return pyproj.Transformer.from_crs(crs, CRS.WGS84, always_xy=True)
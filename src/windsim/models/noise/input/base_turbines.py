@@ -35,15 +35,28 @@ class BaseTurbinesRecipe(Recipe[BaseTurbinesAsset]):
 
         df = pd.DataFrame(self.turbines.d)
 
+        # Positions are converted to a numeric array directly, instead of via an object array
+        if "position_lonlat" not in df:
+            raise ValueError("position_lonlat missing for all models")
+        if df["position_lonlat"].isna().any():
+            raise ValueError("position_lonlat missing for some models")
+        positions = np.asarray(df.pop("position_lonlat").tolist(), dtype=np.float64).reshape(-1, 2)
+
         # Convert to xarray
         ds = xr.Dataset.from_dataframe(df)
+        ds["position_lonlat"] = xr.DataArray(
+            data=positions,
+            dims=("index", "spatial"),
+            coords=dict(spatial=["x", "y"]),
+        )
         ds = xr_as_dtype(ds, dict(
             index="int",
             name=("str", "<unnamed>"),
-            model="str",
+            model="str_interned",
             status=("str", "new"),
+            spatial="str",
             hub_height_m="float",
-            position_lonlat="object",
+            position_lonlat="float",
             elevation_m=("float", np.nan)
         ))
 
@@ -56,35 +69,18 @@ class BaseTurbinesRecipe(Recipe[BaseTurbinesAsset]):
             .drop_vars("index")
         )
 
-        ds["position_lonlat"] = xr.DataArray(
-            data=np.stack(ds["position_lonlat"].values),  # type: ignore
-            dims=("turbine", "spatial"),
-            coords=dict(spatial=["x", "y"]),
-        )
-
-        ds = xr_as_dtype(ds, dict(
-            name="str",
-            model="str",
-            status="str",
-            spatial="str",
-            hub_height_m="float",
-            position_lonlat="float",
-            elevation_m=("float", np.nan)
-        ))
-
 
         # DEBUG: Discard turbines whose model does not appear in turbinetypes.
-        # This triggers a Dask computation.
         if self.config.d.debug.discard_invalid_turbines:
-            def _is_valid(turbines: xr.Dataset, turbinetypes: xr.Dataset):
-                return cast(xr.DataArray, xr.apply_ufunc(
-                    np.isin, turbines['model'], turbinetypes['model'],
-                    input_core_dims=[['turbine'], ['model']],
-                    output_core_dims=[['turbine']]
-                ))
-            is_valid = xr.map_blocks(_is_valid, ds, args=[self.turbine_models.d]).compute()
-            if not is_valid.all():
-                log.warning(f"Discarding {sum(~is_valid.values)} invalid turbines")
-                ds = ds.sel(turbine=is_valid)
+            # Look up each turbine model in the sorted catalog
+            catalog = np.sort(self.turbine_models.d['model'].values)
+            models = ds['model'].values
+            idx = np.searchsorted(catalog, models)
+            is_valid = idx < len(catalog)
+            is_valid[is_valid] = catalog[idx[is_valid]] == models[is_valid]
+            n_invalid = is_valid.size - np.count_nonzero(is_valid)
+            if n_invalid:
+                log.warning(f"Discarding {n_invalid} invalid turbines")
+                ds = ds.isel(turbine=is_valid)
 
         return BaseTurbinesAsset(ds)
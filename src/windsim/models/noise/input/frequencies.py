@@ -1,4 +1,5 @@
 import numpy as np
+import xarray as xr
 import logging
 from typing import override
 
@@ -9,7 +10,7 @@ from windsim.coordinate_reference_systems import CRS
 log = logging.getLogger(__name__)
 
 
-class FrequenciesAsset(DataAsset[np.ndarray]):
+class FrequenciesAsset(DataAsset[xr.DataArray]):
     pass
 
 
@@ -18,6 +19,7 @@ class FrequenciesRecipe(Recipe[FrequenciesAsset]):
 
     @override
     def make(self):
+        frequencies = np.array([63, 125, 250, 500, 1000, 2000, 4000, 8000])
         return FrequenciesAsset(
-            np.array([63, 125, 250, 500, 1000, 2000, 4000, 8000])
+            xr.DataArray(frequencies, dims='frequency', coords=dict(frequency=frequencies))
         )
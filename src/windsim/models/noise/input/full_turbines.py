@@ -32,20 +32,31 @@ class FullTurbinesRecipe(Recipe[FullTurbinesAsset]):
 
         ds = self.turbines.d.chunk(turbine=self.chunksize.d._1d)
 
-        # use real elevation data if elevation not specified
+        # use real elevation data if elevation not specified.
+        # Turbines are few, so their elevations are interpolated eagerly at the in-memory positions,
+        # instead of through many small tasks along the turbine chunks.
+        position = self.turbines.d['position']
         real_elevations = (
             self.elevation.d
             .interp(
-                x=ds['position'].sel(spatial='x'),
-                y=ds['position'].sel(spatial='y')
+                x=xr.DataArray(position.sel(spatial='x').values, dims='turbine'),
+                y=xr.DataArray(position.sel(spatial='y').values, dims='turbine')
             )
             .drop_vars(['x', 'y', 'spatial_ref'], errors='ignore')
+            .compute()
         )
         ds['elevation_m'] = ds['elevation_m'].fillna(real_elevations)
 
-        # add Z coordinate to position
-        position_z = ds['elevation_m'] + ds['hub_height_m']
-        ds = ds.reindex(spatial=['x', 'y', 'z']).chunk(spatial=-1)
-        ds['position'].loc[dict(spatial='z')] = position_z
+        # add Z coordinate to position.
+        # The position is assembled in one step instead of being written into a reindexed array.
+        position_z = (ds['elevation_m'] + ds['hub_height_m']).assign_coords(spatial='z')
+        position = xr.concat([ds['position'], position_z], dim='spatial').transpose(*ds['position'].dims)
+        ds = (
+            ds
+            .drop_vars('position')
+            .reindex(spatial=['x', 'y', 'z'])
+            .assign(position=position)
+            .chunk(spatial=-1)
+        )
 
         return FullTurbinesAsset(ds)
@@ -35,30 +35,27 @@ class TurbineModelsRecipe(Recipe[TurbineModelsAsset]):
 
         # Convert to xarray
         ds = xr.Dataset.from_dataframe(df)
-        ds = xr_as_dtype(ds, dict(
-            model="str",
-            manufacturer=("str", "<MISSING>"),
-            sound_power_db="object",
-        ))
 
-        # Validate length
+        # Validate presence and length
+        if "sound_power_db" not in ds:
+            raise ValueError("sound_power_db missing for all models")
         n = len(self.frequencies.d)
-        lengths = xr.apply_ufunc(
-            len,
-            ds["sound_power_db"],
-            vectorize=True,          # apply elementwise over model
-            output_dtypes=[int],
-        )
-        bad = ds["model"].where(lengths != n, drop=True)
+        levels = ds["sound_power_db"].values
+        if pd.isna(levels).any():
+            raise ValueError("sound_power_db missing for some models")
+        lengths = np.fromiter(map(len, levels), dtype=np.intp, count=len(levels))
+        bad = np.flatnonzero(lengths != n)
         if bad.size:
-            bad_model = bad.values[0]
+            bad_model = ds["model"].values[bad[0]]
             raise ValueError(
                 f"sound_power_db length mismatch for model '{bad_model}' (expected length: {n})"
             )
+        # reshape also covers the case without any model
+        sound_power_db = np.array(levels.tolist(), dtype=np.float64).reshape(len(levels), n)
 
         # Overwrite sound power levels
         ds["sound_power_db"] = xr.DataArray(
-            np.vstack(ds["sound_power_db"].values),  # type: ignore
+            sound_power_db,
             dims=("model", "frequency"),
             coords=dict(
                 model=ds["model"],
@@ -69,7 +66,7 @@ class TurbineModelsRecipe(Recipe[TurbineModelsAsset]):
         # Type validation
         ds = xr_as_dtype(ds, dict(
             model="str",
-            manufacturer="str",
+            manufacturer=("str", "<MISSING>"),
             sound_power_db="float",
             frequency="int"
         ))
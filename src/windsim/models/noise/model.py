@@ -1,4 +1,5 @@
 from __future__ import annotations
+from itertools import accumulate
 from pathlib import Path
 from typing import override
 import logging
@@ -113,7 +114,7 @@ class NoiseSimulationRecipe(Recipe[NoiseSimulationAsset]):
                 self.turbines.d,
                 self.receivers.d,
                 self.barriers_3d.d,
-                xr.DataArray(self.frequencies.d, coords=dict(frequency=self.frequencies.d))
+                self.frequencies.d
             )
 
             # ds = iso.basic.D_Z_sides(
@@ -148,14 +149,13 @@ class NoiseSimulationRecipe(Recipe[NoiseSimulationAsset]):
         
         # split the result back into receiver groups and reattach coordinates
         receiver_groups: dict[str, xr.Dataset] = dict()
-        start = 0
-        for name, group in self.receiver_groups.d.items():
-            res = ds.isel(receiver=slice(start, start + group.sizes['receiver']))
+        bounds = list(accumulate((g.sizes['receiver'] for g in self.receiver_groups.d.values()), initial=0))
+        assert bounds[-1] == ds.sizes['receiver']
+        for (name, group), start, stop in zip(self.receiver_groups.d.items(), bounds[:-1], bounds[1:]):
+            res = ds.isel(receiver=slice(start, stop))
             if 'receiver' in group.coords:
                 res = res.assign_coords(receiver=group.coords['receiver'])
             receiver_groups[name] = res
-            start += group.sizes['receiver']
-        assert start == ds.sizes['receiver']
 
         _duration = round(time.perf_counter() - _graph_start, conf.time_decimal_places)
         log.info("")
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import functools
+import math
 from pathlib import Path
 from typing import Any, Type, cast
 
@@ -22,6 +24,7 @@ import xarray as xr
 from matplotlib.artist import Artist
 from matplotlib.collections import PathCollection
 from matplotlib.legend_handler import HandlerPathCollection
+from matplotlib.lines import Line2D
 from matplotlib.transforms import Affine2D
 from matplotlib_scalebar.scalebar import ScaleBar
 from shapely import LinearRing, MultiPolygon, Point, Polygon
@@ -38,6 +41,11 @@ from .framed_scalebar import FramedScaleBar
 LABEL_BBOX = dict(boxstyle='round,pad=0.2', fc='white', alpha=1, edgecolor='grey')
 
 
+@functools.lru_cache(maxsize=32)
+def _transformer(source: pyproj.CRS, target: pyproj.CRS) -> pyproj.Transformer:
+    return pyproj.Transformer.from_crs(source, target, always_xy=True)
+
+
 def plot(
     plot_variable: str,
     area: Area,
@@ -105,7 +113,10 @@ def plot(
         # compare_contours(cs_lines, r'D:\Noise Verification\Contours radius7km grid1m levels0.25\contours.shp', crs=working_crs_pyproj, num_linepoints=50_000)
         # exit()
 
-        cs_filled = grid_restructured[plot_variable].plot.contourf(
+        # load lazy data once for both the filled contours and the contour lines
+        plot_data = grid_restructured[plot_variable].compute()
+
+        cs_filled = plot_data.plot.contourf(
             ax=ax,
             levels=config.output.map.contour_levels,
             x='x',
@@ -120,7 +131,7 @@ def plot(
         # get the colorbar Axes
         cbar_ax = [_ax for _ax in fig.axes if _ax != ax][0]
 
-        cs_lines = grid_restructured[plot_variable].plot.contour(
+        cs_lines = plot_data.plot.contour(
             ax=ax,
             levels=config.output.map.contour_levels,
             x='x',
@@ -194,6 +205,7 @@ def plot(
 
 
     # add normal receivers
+    extra_legend_handles: list[Artist] = []
     if normal_restructured is not None:
         pos = normal_restructured['position'].transpose('receiver', 'spatial').values
 
@@ -208,19 +220,25 @@ def plot(
                 for t in normal_restructured['name'].values
             ]
             colors = cmap(np.arange(len(pos)))
-            for i in range(len(pos)):
-                ax.scatter(pos[i, 0], pos[i, 1], label=labels[i], color=colors[i], **opts)
+            ax.scatter(pos[:, 0], pos[:, 1], color=colors, **opts)
+            # a single scatter has a single legend entry, so each receiver gets a proxy entry
+            extra_legend_handles.extend(
+                Line2D(
+                    [], [], label=label, marker=opts['marker'], linestyle='',
+                    markersize=math.sqrt(opts['s']), markerfacecolor=color, markeredgecolor='black'
+                )
+                for label, color in zip(labels, colors)
+            )
         else:
             ax.scatter(pos[:, 0], pos[:, 1], label='Receiver', color='red', **opts)
 
         # add result labels
         if config.output.map.add_receiver_labels:
-            res = normal_restructured[plot_variable].values
-            for i, value in enumerate(res):
-                value = round(value, 2)
+            texts = [str(value) for value in np.round(normal_restructured[plot_variable].values, 2).tolist()]
+            for xy, text in zip(pos[:, :2], texts):
                 ax.annotate(
-                    value,
-                    pos[i, :2],
+                    text,
+                    xy,
                     bbox=LABEL_BBOX,
                     textcoords="offset points",
                     xytext=(4, 8),
@@ -247,13 +265,12 @@ def plot(
     #     elevation.plot.pcolormesh(ax=ax, x='x', y='y', alpha=0.5, cbar_kwargs={'label': 'Elevation (m)'}, transform=working_crs_cartopy)
 
     # determine 1 tile unit = x working_crs units
-    working_to_tile = pyproj.Transformer.from_crs(working_crs_pyproj, map_crs_pyproj, always_xy=True)
+    working_to_tile = _transformer(working_crs_pyproj, map_crs_pyproj)
     x1, y1 = (area.botleft[0] + area.topright[0]) / 2, (area.topright[1] + area.botleft[1]) / 2
     delta = 100
     x2, y2 = x1 + delta, y1
-    x1_tile, y1_tile = working_to_tile.transform(x1, y1)
-    x2_tile, y2_tile = working_to_tile.transform(x2, y2)
-    distance_tile = np.linalg.norm([x2_tile - x1_tile, y2_tile - y1_tile])
+    (x1_tile, x2_tile), (y1_tile, y2_tile) = working_to_tile.transform([x1, x2], [y1, y2])
+    distance_tile = math.hypot(x2_tile - x1_tile, y2_tile - y1_tile)
     working_units_per_tileunit = delta / distance_tile
 
     # add scalebar
@@ -276,7 +293,8 @@ def plot(
         handle.update_from(orig)
         handle.set_sizes([marker_size])
     handler_map = {PathCollection: HandlerPathCollection(update_func=update_prop)}
-    ax.legend(loc='upper left', framealpha=1, handler_map=handler_map)
+    legend_handles, _ = ax.get_legend_handles_labels()
+    ax.legend(handles=legend_handles + extra_legend_handles, loc='upper left', framealpha=1, handler_map=handler_map)
     
     # plt.show()
     plt.savefig(folder / 'output.png', dpi=300)
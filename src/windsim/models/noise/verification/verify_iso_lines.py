@@ -1,3 +1,4 @@
+import math
 from collections.abc import Collection, Sequence
 from dataclasses import dataclass
 from pathlib import Path
@@ -5,10 +6,12 @@ from typing import Any, TypeAlias, cast
 
 import geopandas as gpd
 import numpy as np
+import numpy.typing as npt
 import pyproj
 import shapely
 import shapely.ops
 from matplotlib.contour import ContourSet
+from numba import njit
 from shapely import (LinearRing, LineString, MultiLineString, MultiPolygon,
                      Point, Polygon)
 
@@ -82,12 +85,33 @@ def _parse_matplotlib_contours(cs: ContourSet, num_linepoints: int) -> RingSet:
 
 def interp_line(line: LineString, n: int):
     """Interpolate line to `n` evenly spaced points."""
-    distances = np.linspace(0, line.length, n)
-    points = [line.interpolate(distance) for distance in distances]
+    return LineString(_interp_polyline(shapely.get_coordinates(line), n))
+
+
+@njit(cache=True, nogil=True)
+def _interp_polyline(coords: npt.NDArray, n: int) -> npt.NDArray:
+    """Returns `n` points of shape (n,2) evenly spaced by arc length along the polyline `coords` of shape (k,2)."""
+    k = len(coords)
+    cum = np.zeros(k)
+    for i in range(1, k):
+        cum[i] = cum[i-1] + math.hypot(coords[i, 0] - coords[i-1, 0], coords[i, 1] - coords[i-1, 1])
+
+    distances = np.linspace(0, cum[-1], n)
+    points = np.empty((n, 2))
+    j = 0
+    for i in range(n):
+        # segment j from coords[j] to coords[j+1] contains the distance
+        while j < k - 2 and cum[j+1] < distances[i]:
+            j += 1
+        length = cum[j+1] - cum[j]
+        frac = (distances[i] - cum[j]) / length if length > 0 else 0.0
+        points[i, 0] = coords[j, 0] + frac * (coords[j+1, 0] - coords[j, 0])
+        points[i, 1] = coords[j, 1] + frac * (coords[j+1, 1] - coords[j, 1])
+
     # prevent numerical inaccuracies
-    points[0] = line.coords[0]
-    points[-1] = line.coords[-1]
-    return LineString(points)
+    points[0] = coords[0]
+    points[-1] = coords[-1]
+    return points
 
 
 @dataclass
@@ -106,22 +130,29 @@ def _compare_ringsets(ringset: RingSet, other_ringset: RingSet) -> tuple[Compari
         other_rings = other_ringset[level]
         if len(rings) != len(other_rings):
             print(f"Skipping level {level}: Not the same number of contour rings")
-        vertices = np.array([Point(p) for ring in rings for p in ring.coords])
+        vertices = shapely.points(np.concatenate([np.asarray(ring.coords) for ring in rings]))
+
+        # Distance to the nearest ring, found via an index tree instead of checking all rings
+        other_lines = np.array(list(other_rings), dtype=object)
+        nearest = shapely.STRtree(other_lines).nearest(vertices)
+        distances = shapely.distance(other_lines[nearest], vertices)
 
-        other_lines = MultiLineString(list(other_rings))
         other_polygons = MultiPolygon([Polygon(ring) for ring in other_rings])
-        distances = other_lines.distance(vertices)
-        distances[other_polygons.contains(vertices)] *= -1
+        shapely.prepare(other_polygons)
+        distances[shapely.contains(other_polygons, vertices)] *= -1
 
         results[level] = ComparisonResult(
-            min_dist=min(distances),
-            max_dist=max(distances),
-            avg_dist=sum(distances) / len(distances)
+            min_dist=float(distances.min()),
+            max_dist=float(distances.max()),
+            avg_dist=float(distances.mean())
         )
 
+    level_stats = np.array(
+        [(r.min_dist, r.max_dist, r.avg_dist) for r in results.values()], dtype=np.float64
+    ).reshape(-1, 3)
     total_result = ComparisonResult(
-        min_dist=min(r.min_dist for r in results.values()),
-        max_dist=max(r.max_dist for r in results.values()),
-        avg_dist=sum(r.avg_dist for r in results.values()) / len(results)
+        min_dist=float(level_stats[:, 0].min()),
+        max_dist=float(level_stats[:, 1].max()),
+        avg_dist=float(level_stats[:, 2].mean())
     )
     return total_result, results
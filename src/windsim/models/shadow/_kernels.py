@@ -0,0 +1,85 @@
+import numpy as np
+import numpy.typing as npt
+from numba import njit
+
+
+def daily_shadow_block(
+    v_sun: npt.NDArray,
+    day: npt.NDArray,
+    v_receiver_hub: npt.NDArray,
+    rotor_radius_sq: npt.NDArray,
+    L_max: npt.NDArray,
+) -> npt.NDArray:
+    """Counts for each day and receiver the samples in which any turbine casts a shadow on it.
+
+    Parameters
+    ----------
+    v_sun : (i,3)
+        Unit vectors pointing towards the sun.
+    day : (i,)
+        Day of each sample, non-decreasing.
+    v_receiver_hub : (r,t,3)
+        Vectors from each receiver to each turbine hub.
+    rotor_radius_sq : (t,)
+        Squared rotor radius of each turbine.
+    L_max : (t,)
+        Maximum shadow length of each turbine.
+
+    Returns
+    -------
+    daily_samples : (d,r)
+        Number of shadowed samples, for each day from the first to the last day of `day`.
+    """
+    vsun = np.ascontiguousarray(v_sun, dtype=np.float32)
+    vrh = np.moveaxis(v_receiver_hub, -1, 0).astype(np.float32)  # (3,r,t)
+    r2 = rotor_radius_sq.astype(np.float32)
+    Lmax = L_max.astype(np.float32)
+
+    # A turbine can only shade a receiver within the distance given by its maximum shadow length and
+    # rotor radius, since the ray parameter is bounded by L_max and the miss distance by the radius.
+    # Only those pairs are tested, grouped by receiver.
+    norm_sq = (vrh * vrh).sum(axis=0)
+    is_candidate = norm_sq <= Lmax**2 + r2
+    r_idx, t_idx = np.nonzero(is_candidate)
+    indptr = np.zeros(is_candidate.shape[0] + 1, dtype=np.intp)
+    np.cumsum(np.count_nonzero(is_candidate, axis=1), out=indptr[1:])
+    # Structure of arrays: each quantity is contiguous over the pairs
+    pairs = np.stack([
+        vrh[0, r_idx, t_idx], vrh[1, r_idx, t_idx], vrh[2, r_idx, t_idx],
+        norm_sq[r_idx, t_idx], r2[t_idx], Lmax[t_idx]
+    ])
+
+    # Days relative to the first one
+    day = (day - day[0]).astype(np.intp)
+    out = np.zeros((day[-1] + 1, is_candidate.shape[0]), dtype=np.int32)
+    compute_daily_shadow(vsun, day, indptr, pairs, out)
+    return out
+
+
+@njit(cache=True, nogil=True, fastmath=True)
+def compute_daily_shadow(vsun, day, indptr, pairs, out):
+    """Fused shadow test of the turbine-receiver pairs. Shadowed samples are counted per day `day[i]`
+    of each sample into `out` of shape (d,r), so the individual samples are never stored.
+
+    The pairs of receiver `r` are `pairs[:, indptr[r]:indptr[r+1]]`, where `pairs` of shape (6,n)
+    holds the receiver-hub vector components, its squared norm, the squared rotor radius
+    and the maximum shadow length of each pair.
+
+    A receiver is shaded if the sun ray through it passes a rotor disk in front of it,
+    within the maximum shadow length of that turbine. Neither the ray parameter nor the
+    miss distance is kept for all turbines. The loop over pairs has no early exit,
+    so that it is vectorized over the contiguous quantities.
+    """
+    vx, vy, vz, norm_sq, r2, Lmax = pairs[0], pairs[1], pairs[2], pairs[3], pairs[4], pairs[5]
+
+    for i in range(len(vsun)):
+        sx, sy, sz = vsun[i, 0], vsun[i, 1], vsun[i, 2]
+        d = day[i]
+        for r in range(len(indptr) - 1):
+            shaded = False
+            for k in range(indptr[r], indptr[r+1]):
+                # component of the receiver-hub vector along the sun line
+                L = vx[k]*sx + vy[k]*sy + vz[k]*sz
+                # the squared perpendicular miss distance of the sun ray from the rotor center must be within the disk
+                shaded |= (L > 0) & (L <= Lmax[k]) & (norm_sq[k] - L*L <= r2[k])
+            out[d, r] += shaded
@@ -13,6 +13,11 @@ class AdaptedTurbinesAsset(DataAsset[xr.Dataset]):
     pass
 
 
+# L_max = c_bar / (0.2 * delta) with c_bar = 0.5 * depth_sum and delta ~0.0092 rad
+_DELTA = np.deg2rad(0.53)
+_L_MAX_PER_DEPTH_SUM = 0.5 / (0.2 * _DELTA)
+
+
 class AdaptedTurbinesRecipe(Recipe[AdaptedTurbinesAsset]):
     _makes = AdaptedTurbinesAsset
 
@@ -21,19 +26,25 @@ class AdaptedTurbinesRecipe(Recipe[AdaptedTurbinesAsset]):
 
     @override
     def make(self):
-        # Match turbine types with turbines
+        # Match turbine types with turbines, looking up each turbine's type only once
+        turbine_type = self.turbines.d['turbine_type']
+        idx = self.turbine_types.d.indexes['model'].get_indexer(turbine_type.values)
+        if (idx < 0).any():
+            raise KeyError(f"Unknown turbine type '{turbine_type.values[idx < 0][0]}'")
         _ds = (
             self.turbine_types.d[['rotor_diameter_m', 'max_blade_depth_m', 'blade_depth_90_percent_m']]
-            .sel(model=self.turbines.d['turbine_type'])
+            .isel(model=xr.DataArray(idx, dims=turbine_type.dims))
             .drop_vars('model')
         )
 
         ds = self.turbines.d.copy()
+        # Sum of the two blade depths, from which both derived quantities follow by a constant factor
+        depth_sum = _ds['max_blade_depth_m'] + _ds['blade_depth_90_percent_m']
         # Average chord length of a rotor blade
-        ds['c_bar'] = 0.5 * (_ds['max_blade_depth_m'] + _ds['blade_depth_90_percent_m'])
+        ds['c_bar'] = 0.5 * depth_sum
         ds['rotor_radius_m'] = _ds['rotor_diameter_m'] / 2
+        ds['rotor_radius_sq'] = ds['rotor_radius_m']**2
 
-        delta = np.deg2rad(0.53)   # ~0.0092 rad
-        ds['L_max'] = ds['c_bar'] / (0.2 * delta)  # (turbine,)
+        ds['L_max'] = _L_MAX_PER_DEPTH_SUM * depth_sum  # (turbine,)
 
         return AdaptedTurbinesAsset(ds)
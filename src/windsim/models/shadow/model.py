@@ -2,6 +2,7 @@ import logging
 import xarray as xr
 import numpy as np
 import pandas as pd
+import dask.array as da
 from typing import override, Any, cast
 from dataclasses import dataclass
 
@@ -13,11 +14,17 @@ from windsim.models.noise.config import ConfigAsset
 
 from .sunpos import SunposConfAsset, SunposAsset
 from .adapted_turbines import AdaptedTurbinesAsset
+from ._kernels import daily_shadow_block
 
 
 log = logging.getLogger(__name__)
 
 
+# Target size in bytes of a block, i.e. the float32 sun vectors of its samples
+# plus the int32 daily counts of its (date,receiver) output
+_TARGET_CHUNK_BYTES = 100 * 2**20
+
+
 @dataclass
 class ShadowSimulationAsset(Asset):
     result: xr.Dataset
@@ -32,6 +39,7 @@ class ShadowSimulationRecipe(Recipe[ShadowSimulationAsset]):
     crs: _na.WorkingCrs = inject()
     turbines: AdaptedTurbinesAsset = inject()
     sunpos: SunposAsset = inject()
+    sunpos_conf: SunposConfAsset = inject()
     receivers: _na.Receivers = inject()
     elevation: _na.Elevation = inject()
     receiver_groups: _na.ReceiverGroups = inject()
@@ -48,45 +56,69 @@ class ShadowSimulationRecipe(Recipe[ShadowSimulationAsset]):
         # print("DAYMASK")
         # print(daymask)
         # sun_day = sun.where(daymask, drop=True)
-        sun_day = sun.isel(time=daymask).chunk(time=1440*3)
+        day_pos = np.flatnonzero(daymask.values)  # positions of daytime samples
+        sun_day = sun.isel(time=day_pos)
+        # Chunk along whole days, so that each day lies within a single chunk and the daily totals
+        # are computed blockwise. As many days are combined as fit the target size of a block.
+        _days, _samples_per_day = np.unique(sun_day.indexes['time'].normalize(), return_counts=True)
+        _receiver_chunk = max(receivers['position'].chunksizes.get('receiver', (receivers.sizes['receiver'],)))
+        _bytes_per_day = int(_samples_per_day.max(initial=0)) * 3 * 4 + _receiver_chunk * 4
+        _days_per_chunk = max(1, _TARGET_CHUNK_BYTES // max(1, _bytes_per_day))
+        _chunk_starts = np.arange(0, len(_days), _days_per_chunk)
+        _time_chunks = np.add.reduceat(_samples_per_day, _chunk_starts)
+        _day_chunks = np.diff(_chunk_starts, append=len(_days))
         # print("SUN_DAY")
         # print(sun_day)
         # print(sun_day['time'])
 
         ds = xr.Dataset()
 
-        ds['v_receiver_hub'] = (
+        v_receiver_hub = (
             turbines['position'] - receivers['position']
-        ).astype(np.float32, copy=False)
-
-        # component of r along sun line (ray parameter lambda)
-        # (time,receiver,turbine)
-        ds['L_tik'] = ds['v_receiver_hub'].dot(sun_day['v_sun'], 'spatial')
-
-        # perpendicular miss dinstance of sun ray from rotor center
-        ds['d_sq'] = (ds['v_receiver_hub']**2).sum('spatial') - ds['L_tik']**2
-        ds['d_sq'] = xr.where(ds['d_sq'] > 0, ds['d_sq'], 0)  # guard tiny negatives
-
-        # Determine whether shaded or not
-        # ds['sun_ok'] = sun['altitude_rad'] >= np.deg2rad(3.0)
-        ds['front_ok'] = ds['L_tik'] > 0
-        ds['disk_ok'] = ds['d_sq'] <= turbines['rotor_radius_m']**2
-        ds['size_ok'] = ds['L_tik'] <= turbines['L_max']
-
-        ds['shadow_per_turbine'] = ds['front_ok'] & ds['disk_ok'] & ds['size_ok']
-        ds['shadow'] = ds['shadow_per_turbine'].any(dim="turbine")
-
-        # duration of each sample in minutes
-        _delta: pd.Timedelta = ds.indexes["time"][1] - ds.indexes["time"][0]
+        ).astype(np.float32, copy=False).transpose('receiver', 'turbine', 'spatial').chunk(turbine=-1, spatial=-1)
+
+        # Daily totals (number of shadowed samples per day).
+        # The per-turbine tests and the daily counting are fused into a single kernel,
+        # so neither (time,receiver,turbine) intermediates nor the (time,receiver) samples are materialized.
+        if len(_days) > 0:
+            _day_of_sample = da.from_array(
+                np.repeat(np.arange(len(_days)), _samples_per_day),
+                chunks=(tuple(_time_chunks.tolist()),)
+            )
+            _daily_data = da.blockwise(
+                daily_shadow_block, 'tr',
+                sun_day['v_sun'].chunk(time=tuple(_time_chunks.tolist())).transpose('time', 'spatial').data, 'ts',
+                _day_of_sample, 't',
+                v_receiver_hub.data, 'rus',
+                turbines['rotor_radius_sq'].chunk(turbine=-1).data, 'u',
+                turbines['L_max'].chunk(turbine=-1).data, 'u',
+                adjust_chunks={'t': tuple(_day_chunks.tolist())},
+                concatenate=True,
+                dtype=np.int32,
+                meta=np.empty((0, 0), dtype=np.int32),
+            )
+        else:
+            # no daylight samples, so there is no day with shadow
+            log.warning("No daylight samples, shadow durations are all zero")
+            _daily_data = da.zeros((0, v_receiver_hub.sizes['receiver']), chunks=((0,), v_receiver_hub.chunks[0]), dtype=np.int32)
+        _daily_samples = xr.DataArray(
+            _daily_data,
+            dims=('date', 'receiver'),
+            coords=dict(date=_days),
+        ).assign_coords(v_receiver_hub.isel(turbine=0, spatial=0, drop=True).coords)  # (date,receiver)
+
+        # duration of each sample in minutes, from the configured frequency,
+        # since there may be fewer than two daylight samples
+        _delta = pd.to_timedelta(pd.tseries.frequencies.to_offset(self.sunpos_conf.frequency))
         _minutes_per_sample = _delta / pd.Timedelta("1min")
 
-        # Daily totals (number of shadowed samples per day)
-        _daily_samples = ds['shadow'].resample(time="1D").sum().rename(time="date")  # dims: (receiver, date)
         ds['daily_minutes'] = _daily_samples * _minutes_per_sample
-        ds['max_daily_minutes'] = ds['daily_minutes'].max("date")
+        # without any day, the maximum has no identity and is zero like the sum
+        ds['max_daily_minutes'] = ds['daily_minutes'].max("date") if len(_days) > 0 else ds['daily_minutes'].sum("date")
         ds['annual_minutes'] = ds['daily_minutes'].sum("date")
 
-        ds['shadow_days'] = ds['shadow'].resample(time="1D").any().rename(time="date")
+        # A day has shadow if any of its samples is shadowed
+        ds['shadow_days'] = _daily_samples > 0
         ds['annual_shadow_days'] = ds['shadow_days'].sum("date")
 
         ds['exceeds_daily_30min'] = ds['daily_minutes'] > 30
@@ -1,6 +1,6 @@
 from pathlib import Path
 from planner import RecipeBundle, StaticRecipe
-from planner import Planner, StaticRecipe
+from planner import Planner, StaticRecipe, store
 
 from windsim.common import assets as common_assets, recipes as common_recipes
 from windsim.models.noise import assets as noise_assets, recipes as noise_recipes
@@ -10,6 +10,8 @@ from . import assets as shadow_assets, recipes as shadow_recipes
 
 
 RECIPE_BUNDLE = RecipeBundle([
+    store.recipes.StorageProvider,
+
     common_recipes.ExistingTurbinesJson,
     common_recipes.ScenariosJson,
     common_recipes.TurbineTypesJson,
@@ -50,6 +52,7 @@ def run_simulation(root: Path | str, project: str, config_path: Path | str | Non
     plan = (
         Planner()
         .add(StaticRecipe(noise_assets.Config(config)))
+        .add(StaticRecipe(store.assets.StorageConf(root=root)))
         .add(StaticRecipe(common_assets.DaskClusterConf(
             num_workers=config.computation.num_workers,
             threads_per_worker=config.computation.threads_per_worker,
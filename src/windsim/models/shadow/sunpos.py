@@ -1,3 +1,5 @@
+import os
+import tempfile
 import xarray as xr
 import numpy as np
 import pandas as pd
@@ -8,7 +10,7 @@ from typing import override, Any, cast
 from soltrack import SolTrack
 import pyproj
 
-from planner import Asset, DataAsset, Recipe, inject
+from planner import Asset, DataAsset, Recipe, inject, store
 
 from windsim.coordinate_reference_systems import CRS
 from windsim.models.noise import assets as noise_assets
@@ -26,7 +28,11 @@ class SunposAsset(DataAsset[xr.Dataset]):
 
 class SunposRecipe(Recipe[SunposAsset]):
     _makes = SunposAsset
+    _caps = [
+        store.StorageCap(tag="sunpos", shared=True)
+    ]
 
+    storage: store.assets.StorageProvider = inject()
     conf: SunposConfAsset = inject()
     area: noise_assets.Area = inject()
     working_crs: noise_assets.WorkingCrs = inject()
@@ -47,21 +53,27 @@ class SunposRecipe(Recipe[SunposAsset]):
         t = pyproj.Transformer.from_crs(self.working_crs.d, CRS.WGS84, always_xy=True, area_of_interest=self.aoi.d)
         lon, lat = t.transform(*center)
 
-        _azimuth, _altitude = _solpos_one_point(lon, lat, ds['time'])
+        # Solar positions only depend on year, frequency and the location.
+        # They are stored per key, with the location rounded to ~1 km, and reused by later runs.
+        path = self.storage.persistent_dir() / f"sunpos(year={self.conf.year},frequency={self.conf.frequency},lon={lon:.2f},lat={lat:.2f}).npz"
+        if path.is_file():
+            with np.load(path) as f:
+                _azimuth, _altitude = f['azimuth'], f['altitude']
+        else:
+            _azimuth, _altitude = _solpos_one_point(lon, lat, ds['time'])
+            with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False) as f:
+                np.savez(f, azimuth=_azimuth, altitude=_altitude)
+            os.replace(f.name, path)
         ds['azimuth_rad'] = ('time', _azimuth)
         ds['altitude_rad'] = ('time', _altitude)
 
-        ds['v_sun'] = xr.concat(
-            cast(
-                list[xr.DataArray],
-                [
-                    np.cos(ds['altitude_rad']) * np.sin(ds['azimuth_rad']),
-                    np.cos(ds['altitude_rad']) * np.cos(ds['azimuth_rad']),
-                    np.sin(ds['altitude_rad'])
-                ]
-            ),
-            dim='spatial'
-        ).assign_coords(spatial=['x', 'y', 'z']).astype(np.float32, copy=False)
+        # Unit vectors towards the sun, written into a single (time,spatial) array
+        _cos_altitude = np.cos(_altitude)
+        v_sun = np.empty((len(_altitude), 3), dtype=np.float32)
+        v_sun[:, 0] = _cos_altitude * np.sin(_azimuth)
+        v_sun[:, 1] = _cos_altitude * np.cos(_azimuth)
+        v_sun[:, 2] = np.sin(_altitude)
+        ds['v_sun'] = xr.DataArray(v_sun, dims=('time', 'spatial'), coords=dict(spatial=['x', 'y', 'z']))
 
         return SunposAsset(ds)
 